@@ -1,16 +1,115 @@
-from bisect import bisect
-
+import re
 
 SYMBOL_ANY = 'A'
 SYMBOL_EPSILON = 'E'
 
+# maximum amount of DFA states that a lazy DFA keeps before flushing its cache
+LAZY_DFA_CACHE_SIZE = 4096
+# maximum amount of chunk successor masks that a bit-parallel simulator keeps before flushing its cache
+BIT_PARALLEL_CACHE_SIZE = 1 << 16
+# finds the bytes of a state mask that have active states
+NONZERO_BYTE = re.compile(b"[^\x00]")
+
+# finds the strongly connected components of a graph with n_states vertices(Tarjan's algorithm, without recursion).
+# successors(state) must return the states that the given state has edges to.
+# returns the list of components(lists of states) and the component index of every state.
+# a component comes after every component that it has edges to
+def strongly_connected_components(n_states : int, successors) -> tuple:
+    # order in which the states were discovered, -1 for states that haven't been discovered yet
+    discovered = [-1] * n_states
+    # the earliest discovered state reachable from the subtree of the state
+    low_link = [0] * n_states
+    component_of = [-1] * n_states
+    components = []
+    # states that are discovered but not yet assigned to a component
+    stack = []
+    n_discovered = 0
+
+    for root in range(n_states):
+        if discovered[root] != -1:
+            continue
+
+        # (state, iterator over its successors) pairs of the current depth first search path
+        path = [(root, iter(successors(root)))]
+        discovered[root] = low_link[root] = n_discovered
+        n_discovered += 1
+        stack.append(root)
+
+        while len(path) > 0:
+            state_index, targets = path[-1]
+            descended = False
+            for other_state in targets:
+                if discovered[other_state] == -1:
+                    discovered[other_state] = low_link[other_state] = n_discovered
+                    n_discovered += 1
+                    stack.append(other_state)
+                    path.append((other_state, iter(successors(other_state))))
+                    descended = True
+                    break
+                if component_of[other_state] == -1:
+                    low_link[state_index] = min(low_link[state_index], discovered[other_state])
+
+            if descended:
+                continue
+
+            path.pop()
+            if len(path) > 0:
+                parent = path[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[state_index])
+
+            # the state is the root of a component: everything above it on the stack belongs to the component
+            if low_link[state_index] == discovered[state_index]:
+                component = []
+                while True:
+                    other_state = stack.pop()
+                    component_of[other_state] = len(components)
+                    component.append(other_state)
+                    if other_state == state_index:
+                        break
+                components.append(component)
+
+    return components, component_of
+
+# returns the symbol classes given as dict(symbol, symbol standing for its class) as a sorted list of strings,
+# one per class with more than one symbol: the symbol standing for the class, then the other symbols of the class
+def class_groups(classes : dict) -> list:
+    members = dict()
+    for symbol, class_symbol in classes.items():
+        if symbol != class_symbol:
+            members.setdefault(class_symbol, []).append(symbol)
+
+    return [class_symbol + "".join(sorted(members[class_symbol])) for class_symbol in sorted(members)]
+
+# returns the symbol classes given as a list of strings in the form returned by class_groups
+def parse_class_groups(groups : list) -> dict:
+    return {symbol : group[0] for group in groups for symbol in group[1:]}
+
 class NFA:
     """Constructor"""
 
     # initializes an NFA with the given states. STATES MUST BE A LIST OF DICT(SYMBOL, SET(INT)) OF TRANSITIONS 
-    def __init__(self, states : list, accept_states : set) -> None:
+    # accept_tags can map accept states to sets of tags(like indices of the patterns they accept),
+    # the optimization passes keep them up to date.
+    # classes maps symbols to the symbol that stands for their whole equivalence class(see symbol_class),
+    # symbols that aren't in it stand for themselves
+    def __init__(self, states : list, accept_states : set, accept_tags : dict = None, classes : dict = None) -> None:
         self.states = states
         self.accept_states = accept_states
+        self.accept_tags = accept_tags
+        self.classes = dict() if classes is None else classes
+
+    # builds the NFA from a list of edges given as three sequences of the same length(edge e goes from sources[e]
+    # to targets[e] with the symbol symbols[edge_symbols[e]]). same arguments as CompactNFA.from_edges
+    @classmethod
+    def from_edges(cls, symbols : list, n_states : int, sources, edge_symbols, targets, accept_states) -> "NFA":
+        states = [dict() for state_index in range(n_states)]
+        for source, symbol_id, target in zip(sources, edge_symbols, targets):
+            symbol = symbols[symbol_id]
+            if symbol not in states[source]:
+                states[source][symbol] = set()
+            states[source][symbol].add(target)
+
+        return cls(states, set(accept_states))
 
     
     """Regular expression operations on NFA. Thompson's algorithm is being used."""
@@ -130,166 +229,362 @@ class NFA:
     
     # replaces all epsilon transitions from self and returns the result
     def remove_epsilon(self):
-        # strategy can probably be optimized
-        # can also be broken down into two methods: 
-        # one for determining new accept states and another for getting rid of epsilon transitions
-        
-        # First part
-        # all states that have an epsilon transition to an accept state become accept states themselves
-        while True:
-            # save the amount of accept states initially
-            former_accept_count = len(self.accept_states)
-
-            # iterate over all the states
-            for state_index, state in enumerate(self.states):
-                # don't waste time iterating if the current state is already an accept one
-                if state_index in self.accept_states:
-                    continue
-
-                try:
-                    # check epsilon transitions
-                    for other_state in state[SYMBOL_EPSILON]:
-                        # make the current state an accept state if it has an epsilon transition to one
-                        if other_state in self.accept_states:
-                            self.accept_states.add(state_index)
-                            break
-                # the state might have no epsilon transitions
-                except KeyError:
-                    pass
-
-            # if no new accept states were added, break out of the loop
-            if len(self.accept_states) == former_accept_count:
-                break
-        
+        # every state gets the symbol transitions of all the states in its epsilon closure,
+        # and becomes an accept state if its closure contains one.
+        # states on an epsilon cycle have the same closure, so closures are computed once per strongly connected component
+        # of the epsilon transitions, going from the components that have no epsilon transitions out of them backwards
+        components, component_of = self.__epsilon_components()
+
+        # symbol transitions, acceptance and accept tags of the whole closure for every component
+        merged = []
+        merged_accept = []
+        merged_tags = []
+        for component_index, component in enumerate(components):
+            transitions = dict()
+            is_accept = False
+            tags = set()
+            successors = set()
+            for state_index in component:
+                for symbol, targets in self.states[state_index].items():
+                    if symbol == SYMBOL_EPSILON:
+                        for other_state in targets:
+                            successors.add(component_of[other_state])
+                    elif symbol in transitions:
+                        transitions[symbol].update(targets)
+                    else:
+                        transitions[symbol] = set(targets)
 
-        # Second part
-        # all states having epsilon transitions additionally get the same transitions 
-        # as the ones that they have epsilon transitions to
-        been = []
-        for i in range(len(self.states)):
-            been.append(set())
-
-        while True:
-            # loop until there is at least one epsilon transition left
-            total_epsilon_count = 0
-            for state in self.states:
-                try:
-                    total_epsilon_count += len(state[SYMBOL_EPSILON])
-                except:
-                    pass
-            if total_epsilon_count == 0:
-                break
-
-            for state_index, state in enumerate(self.states):
-                try:
-                    # discard epsilon transition into itself
-                    state[SYMBOL_EPSILON].discard(state_index)
-                    # copy the initial set of states to which we have epsilon transitions
-                    former_epsilon_transitions = set(state[SYMBOL_EPSILON])
-                    
-                    # note that we've been to these states with epsilon transitions
-                    been[state_index].update(former_epsilon_transitions)
-
-                    for other_state in former_epsilon_transitions:
-                        # add to the current one all the transitions of the states to which we have epsilons
-                        for symbol in self.states[other_state]:
-                            try:
-                                # only add new epsilon transitions if we haven't had them yet 
-                                # otherwise we can have infinite loops
-                                if symbol == SYMBOL_EPSILON:
-                                    for ep_tr in self.states[other_state][SYMBOL_EPSILON]:
-                                        if ep_tr not in been[state_index]:
-                                            state[SYMBOL_EPSILON].add(ep_tr)
-                                else:
-                                    state[symbol].update(self.states[other_state][symbol])
-
-                            except KeyError:
-                                state[symbol] = set(self.states[other_state][symbol])
-
-                    # get rid of initial epsilon transitions
-                    state[SYMBOL_EPSILON] -= former_epsilon_transitions
-                
-                # ignore states with no epsilon transitions
-                except KeyError:
-                    pass
-
-        for state in self.states:
-            try:
-                # these sets are all empty at this point
-                state.pop(SYMBOL_EPSILON)
-            except:
-                pass
+                if state_index in self.accept_states:
+                    is_accept = True
+                if self.accept_tags is not None and state_index in self.accept_tags:
+                    tags.update(self.accept_tags[state_index])
+
+            # components are ordered so that the ones we have epsilon transitions to are already done
+            successors.discard(component_index)
+            for successor in successors:
+                for symbol, targets in merged[successor].items():
+                    if symbol in transitions:
+                        transitions[symbol].update(targets)
+                    else:
+                        transitions[symbol] = set(targets)
+                is_accept = is_accept or merged_accept[successor]
+                tags.update(merged_tags[successor])
+
+            # a state of the closure with only a default transition also moves with the symbols
+            # that other states of the closure have transitions for, so these symbols get the default targets too
+            if SYMBOL_ANY in transitions:
+                for symbol in transitions:
+                    transitions[symbol].update(transitions[SYMBOL_ANY])
+
+            merged.append(transitions)
+            merged_accept.append(is_accept)
+            merged_tags.append(tags)
+
+        for state_index in range(len(self.states)):
+            component_index = component_of[state_index]
+            self.states[state_index] = {symbol : set(targets) for symbol, targets in merged[component_index].items()}
+            if merged_accept[component_index]:
+                self.accept_states.add(state_index)
+
+        if self.accept_tags is not None:
+            self.accept_tags = {state_index : set(merged_tags[component_of[state_index]]) for state_index in range(len(self.states))
+                                if len(merged_tags[component_of[state_index]]) > 0}
 
         return self
+
+    # finds the strongly connected components of the graph of epsilon transitions.
+    # returns the list of components(lists of state indices) and the component index of every state.
+    # a component comes after every component that it has epsilon transitions to
+    def __epsilon_components(self):
+        return strongly_connected_components(len(self.states), lambda state_index: self.states[state_index].get(SYMBOL_EPSILON, ()))
     
-    # removes all the states that are unreachable and returns the result
+    # removes all the states that are unreachable from the start state and returns the result
     def remove_unreachable(self):
-        # an iteration might create new unreachable states, so keep looping
-        while True:
-            # save the initial total amount of states
-            n_states = len(self.states)
-            # do a single iteration of removing unreachable states
-            self = self.__remove_unreachable_helper()
-            # break the loop if no states were removed in this iteration
-            if len(self.states) == n_states:
-                break
-            
-        return self
-    
-    # does one iteration removing unreachable states
-    def __remove_unreachable_helper(self):
-        reachable = set()
-        # iterate over all the states to see which ones have at least one state transitioning to them
-        for state in self.states:
+        # breadth first search from the start state. states get their new indices in the order they are found
+        new_index = [-1] * len(self.states)
+        new_index[0] = 0
+        order = [0]
+        for state_index in order:
+            for targets in self.states[state_index].values():
+                for other_state in targets:
+                    if new_index[other_state] == -1:
+                        new_index[other_state] = len(order)
+                        order.append(other_state)
+
+        # renumber the reachable states and their transitions in one pass
+        new_states = []
+        for state_index in order:
+            state = self.states[state_index]
             for symbol in state:
-                for other_state in state[symbol]:
-                    reachable.add(other_state)
+                state[symbol] = set(new_index[other_state] for other_state in state[symbol])
+            new_states.append(state)
+        self.states = new_states
 
-        unreachable = []
-        # iterate over the indices of the states to see which one of them is unreachable
-        # skip the start(index 0) state
-        for i in range(1, len(self.states)):
-            if i not in reachable:
-                unreachable.append(i)
+        self.accept_states = set(new_index[accept_state] for accept_state in self.accept_states if new_index[accept_state] != -1)
+        if self.accept_tags is not None:
+            self.accept_tags = {new_index[accept_state] : tags for accept_state, tags in self.accept_tags.items() if new_index[accept_state] != -1}
 
-        # remove unreachable states from the states of the NFA
-        unreachable_set = set(unreachable)
-        new_states = []
-        for state_index, state in enumerate(self.states):
-            if state_index not in unreachable_set:
-                new_states.append(state)
-        self.states = new_states
+        return self
 
-        # same thing for accept states
-        for unreachable_state in unreachable:
-            self.accept_states.discard(unreachable_state)
 
-        # adjust the indices of the states that are left 
+    """Operations for turning NFA into a minimal DFA"""
+
+    # replaces self with an equivalent DFA(every state has at most one transition per symbol) and returns the result.
+    # NFA MUST NOT HAVE EPSILON TRANSITIONS
+    def determinize(self):
+        return self.__load_table(*self.__tagged_dfa_table())
+
+    # replaces self with the minimal equivalent DFA and returns the result. NFA MUST NOT HAVE EPSILON TRANSITIONS
+    def minimize(self):
+        return self.__load_table(*self.__tagged_dfa_table(minimal=True))
+
+    # returns (alphabet, table, accepting) of the complete DFA equivalent to self(minimal if asked to):
+    # table[state][symbol index] is the target state for the symbol alphabet[symbol index],
+    # accepting[state] tells whether the state is an accept state. state 0 is the start state.
+    # the alphabet has one symbol per symbol class(see symbol_class). symbols outside it follow the SYMBOL_ANY column
+    # if there is one and lead nowhere otherwise. NFA MUST NOT HAVE EPSILON TRANSITIONS
+    def dfa_table(self, minimal : bool = False):
+        alphabet, table, accepting, tags = self.__tagged_dfa_table(minimal)
+        return alphabet, table, accepting
+
+    # same as dfa_table, but also returns the tags of the DFA states: tags[state] is the frozenset of the accept_tags
+    # of the NFA states it stands for, or tags is None if the NFA has no accept_tags.
+    # minimization only merges states with the same tags
+    def __tagged_dfa_table(self, minimal : bool = False):
+        alphabet, table, accepting, tags = self.__subset_table()
+        if minimal:
+            table, accepting, tags = NFA.__hopcroft(alphabet, table, accepting, tags)
+
+        return alphabet, table, accepting, tags
+
+    # does the subset construction and returns (alphabet, table, accepting, tags) of the complete DFA:
+    # table[state][symbol index] is the target state, accepting[state] tells whether the state is an accept state,
+    # tags[state] is the union of the accept_tags of its NFA states(tags is None if the NFA has no accept_tags).
+    # state 0 is the start state. if the NFA has SYMBOL_ANY transitions, SYMBOL_ANY is the last symbol of the alphabet
+    # and its column is where every symbol that's not in the alphabet goes
+    def __subset_table(self):
+        alphabet = set()
         for state in self.states:
-            for symbol in state:
-                former_transitions = set(state[symbol])
-                state[symbol] = set()
-                for other_state in former_transitions:
-                    state[symbol].add(other_state - bisect(unreachable, other_state))
-        
-        former_accept_states = set(self.accept_states)
+            alphabet.update(state)
+        alphabet.discard(SYMBOL_EPSILON)
+        has_any = SYMBOL_ANY in alphabet
+        alphabet.discard(SYMBOL_ANY)
+        alphabet = sorted(alphabet)
+        if has_any:
+            alphabet.append(SYMBOL_ANY)
+
+        start = frozenset([0])
+        ids = {start : 0}
+        state_sets = [start]
+        table = []
+        accepting = []
+        tags = None if self.accept_tags is None else []
+
+        # state_sets grows while we iterate, each set gets processed exactly once
+        for state_set in state_sets:
+            row = []
+            for symbol in alphabet:
+                target_set = set()
+                for nfa_state in state_set:
+                    target_set.update(self.next_states(nfa_state, symbol))
+                target_set = frozenset(target_set)
+
+                if target_set not in ids:
+                    ids[target_set] = len(state_sets)
+                    state_sets.append(target_set)
+                row.append(ids[target_set])
+
+            table.append(row)
+            accepting.append(not self.accept_states.isdisjoint(state_set))
+            if tags is not None:
+                state_tags = set()
+                for nfa_state in state_set:
+                    state_tags.update(self.accept_tags.get(nfa_state, ()))
+                tags.append(frozenset(state_tags))
+
+        return alphabet, table, accepting, tags
+
+    # merges equivalent states of the complete DFA given as (alphabet, table, accepting, tags) using Hopcroft's
+    # algorithm. tags can be None, otherwise only states with the same tags are merged.
+    # returns (table, accepting, tags) of the minimal DFA, with the start state at index 0
+    @staticmethod
+    def __hopcroft(alphabet : list, table : list, accepting : list, tags : list):
+        n_states = len(table)
+        n_symbols = len(alphabet)
+
+        # inverse[symbol index][state] lists the states that move to state with the symbol
+        inverse = [[[] for state in range(n_states)] for symbol_index in range(n_symbols)]
+        for state, row in enumerate(table):
+            for symbol_index, target in enumerate(row):
+                inverse[symbol_index][target].append(state)
+
+        # initial partition: accept and non-accept states, accept states are also split by their tags
+        blocks = []
+        block_of = [0] * n_states
+        initial_blocks = dict()
+        for state in range(n_states):
+            key = (accepting[state], None if tags is None else tags[state])
+            if key not in initial_blocks:
+                initial_blocks[key] = len(blocks)
+                blocks.append(set())
+            block_of[state] = initial_blocks[key]
+            blocks[block_of[state]].add(state)
+
+        # (block, symbol index) pairs that still have to be used as splitters.
+        # all the initial blocks but one are enough, leave out the largest one
+        waiting = set()
+        if len(blocks) > 1:
+            largest = max(range(len(blocks)), key=lambda block_index: len(blocks[block_index]))
+            for block_index in range(len(blocks)):
+                if block_index != largest:
+                    for symbol_index in range(n_symbols):
+                        waiting.add((block_index, symbol_index))
+
+        while len(waiting) > 0:
+            splitter, symbol_index = waiting.pop()
+
+            # group the states that move into the splitter by the block they are in
+            touched = dict()
+            for state in blocks[splitter]:
+                for predecessor in inverse[symbol_index][state]:
+                    touched.setdefault(block_of[predecessor], set()).add(predecessor)
+
+            for block_index, inside in touched.items():
+                block = blocks[block_index]
+                if len(inside) == len(block):
+                    continue
+
+                # split the block, moving the smaller half into a new block.
+                # the smaller half is always enough as a future splitter, that's what makes it O(n log n)
+                if len(inside) <= len(block) - len(inside):
+                    moved = inside
+                else:
+                    moved = block - inside
+                block -= moved
+
+                new_block_index = len(blocks)
+                blocks.append(moved)
+                for state in moved:
+                    block_of[state] = new_block_index
+
+                for other_symbol_index in range(n_symbols):
+                    waiting.add((new_block_index, other_symbol_index))
+
+        # number the blocks in the order they are reached from the start state, so that the start state gets index 0
+        new_index = {block_of[0] : 0}
+        order = [block_of[0]]
+        new_table = []
+        new_accepting = []
+        new_tags = None if tags is None else []
+        for block_index in order:
+            representative = next(iter(blocks[block_index]))
+            row = []
+            for target in table[representative]:
+                target_block = block_of[target]
+                if target_block not in new_index:
+                    new_index[target_block] = len(order)
+                    order.append(target_block)
+                row.append(new_index[target_block])
+
+            new_table.append(row)
+            new_accepting.append(accepting[representative])
+            if tags is not None:
+                new_tags.append(tags[representative])
+
+        return new_table, new_accepting, new_tags
+
+    # replaces the states of self with the complete DFA given as (alphabet, table, accepting, tags) and returns
+    # the result. accept_tags are set from tags, unless it's None.
+    # states that can't reach any accept state are left out along with the transitions into them.
+    # if there's a SYMBOL_ANY column, it becomes the default transition of every state, and symbols only get
+    # transitions of their own where they go somewhere else
+    def __load_table(self, alphabet : list, table : list, accepting : list, tags : list = None):
+        # find the states that can reach an accept state by walking the transitions backwards
+        predecessors = [[] for state in table]
+        for state, row in enumerate(table):
+            for target in row:
+                predecessors[target].append(state)
+
+        live = [False] * len(table)
+        stack = [state for state in range(len(table)) if accepting[state]]
+        for state in stack:
+            live[state] = True
+        while len(stack) > 0:
+            state = stack.pop()
+            for predecessor in predecessors[state]:
+                if not live[predecessor]:
+                    live[predecessor] = True
+                    stack.append(predecessor)
+
+        # the start state stays even if it's dead, the NFA would be empty otherwise
+        live[0] = True
+
+        new_index = []
+        n_live = 0
+        for state in range(len(table)):
+            new_index.append(n_live if live[state] else -1)
+            if live[state]:
+                n_live += 1
+
+        any_index = alphabet.index(SYMBOL_ANY) if SYMBOL_ANY in alphabet else -1
+        # index of a state with no transitions at all. symbols that lead to a dead state while the default
+        # transition doesn't need an explicit transition into it
+        sink = n_live
+
+        self.states = []
         self.accept_states = set()
-        # same thing for accept states
-        for accept_state in former_accept_states:
-            self.accept_states.add(accept_state - bisect(unreachable, accept_state))
+        if tags is not None:
+            self.accept_tags = dict()
+        for state, row in enumerate(table):
+            if not live[state]:
+                continue
+
+            transitions = dict()
+            default_target = row[any_index] if any_index != -1 else -1
+            for symbol, target in zip(alphabet, row):
+                if symbol != SYMBOL_ANY and target == default_target:
+                    continue
+                if live[target]:
+                    transitions[symbol] = set([new_index[target]])
+                elif default_target != -1 and live[default_target]:
+                    transitions[symbol] = set([sink])
+            self.states.append(transitions)
+
+            if accepting[state]:
+                self.accept_states.add(new_index[state])
+                if tags is not None and len(tags[state]) > 0:
+                    self.accept_tags[new_index[state]] = set(tags[state])
+
+        if any(sink in targets for state in self.states for targets in state.values()):
+            self.states.append(dict())
 
         return self
 
 
     """Used for navigating through NFA"""
     
+    # returns the symbol that stands for the equivalence class of the given one. transitions only ever use these:
+    # symbols of the same class behave the same everywhere in the NFA, so one of them carries the transitions of all
+    def symbol_class(self, symbol : str) -> str:
+        return self.classes.get(symbol, symbol)
+
     # returns the set of states reachable from the current state with the given symbol
+    # SYMBOL_ANY transitions are the default: they are taken for every symbol that the state has no transitions for
     def next_states(self, current_state, symbol):
+        symbol = self.classes.get(symbol, symbol)
         try:
             return self.states[current_state][symbol]
+        except:
+            pass
+        try:
+            return self.states[current_state][SYMBOL_ANY]
         except:
             return set()
 
+    # returns True if the given state is an accept state
+    def is_accept(self, current_state : int) -> bool:
+        return current_state in self.accept_states
+
     """Used for representing NFA"""
     
     # returns a string representation of NFA in the following form:
@@ -297,6 +592,8 @@ class NFA:
     # [accept state indices]
     # for every state:
     #     {count of transitions from this state} [transitions in the form [{symbol} {state}]]
+    # if there are symbol classes, the first line gets their count as a fourth number and they come last, in one line:
+    # [classes in the form {symbol standing for the class}{other symbols of the class}]
     def to_string(self):
         res = ""
         
@@ -307,7 +604,11 @@ class NFA:
             for symbol in state:
                 n_transitions += len(state[symbol])
 
-        res += str(n_states) + " " + str(n_accept_states) + " " + str(n_transitions) + "\n"
+        res += str(n_states) + " " + str(n_accept_states) + " " + str(n_transitions)
+        groups = class_groups(self.classes)
+        if len(groups) > 0:
+            res += " " + str(len(groups))
+        res += "\n"
 
         for accept_state in self.accept_states:
             res += str(accept_state) + " "
@@ -328,4 +629,232 @@ class NFA:
 
             res += "\n"
 
+        if len(groups) > 0:
+            res += " ".join(groups) + "\n"
+
         return res
+
+    # reads an NFA in the form given by to_string from the given iterator of lines.
+    # takes exactly as many lines as the description needs, so it can be given lines of a longer input
+    @classmethod
+    def from_lines(cls, lines) -> "NFA":
+        # read and process the first line
+        desc = next(lines).split()
+        n_states = int(desc[0])
+
+        # read the accept states
+        accept_states = set(int(accept_state) for accept_state in next(lines).split())
+
+        # take the transitions of each state
+        states = []
+        for i in range(n_states):
+            # info about the transitions of a single state: count, then {symbol} {state} pairs
+            info = next(lines).split()
+            state = dict()
+            for pos in range(1, 1 + 2 * int(info[0]), 2):
+                symbol = info[pos]
+                if symbol not in state:
+                    state[symbol] = set()
+                state[symbol].add(int(info[pos + 1]))
+            states.append(state)
+
+        # read the symbol classes if there are any
+        classes = dict()
+        if len(desc) > 3:
+            classes = parse_class_groups(next(lines).split())
+
+        return cls(states, accept_states, classes=classes)
+
+    # reads an NFA from the string representation given by to_string
+    @classmethod
+    def from_string(cls, text : str) -> "NFA":
+        return cls.from_lines(iter(text.split("\n")))
+
+
+class LazyDFA:
+    """Lazily determinized view of an epsilon-free NFA. DFA states are discovered only when the input reaches them."""
+
+    # initializes an empty DFA over the given NFA(anything with next_states and is_accept, like NFA or CompactNFA).
+    # at most cache_size DFA states are kept at a time
+    def __init__(self, nfa, cache_size : int = LAZY_DFA_CACHE_SIZE) -> None:
+        self.nfa = nfa
+        self.cache_size = cache_size
+        self.flush()
+
+    # forgets every DFA state and transition discovered so far
+    def flush(self):
+        # maps frozensets of NFA states to DFA state ids
+        self.ids = dict()
+        # DFA state id -> frozenset of NFA states
+        self.state_sets = []
+        # DFA state id -> dict(symbol, DFA state id) of the transitions computed so far
+        self.transitions = []
+        # DFA state id -> whether at least one of its NFA states is an accept state
+        self.accepting = []
+
+    # returns the DFA state id for the given set of NFA states, adding a new DFA state if it's the first time we see it
+    def intern(self, state_set : frozenset) -> int:
+        try:
+            return self.ids[state_set]
+        except KeyError:
+            pass
+
+        # the cache is full: throw everything away and start over. ids handed out before this point become invalid,
+        # which is fine because callers only ever hold on to the id that the current step returns
+        if len(self.state_sets) >= self.cache_size:
+            self.flush()
+
+        state_id = len(self.state_sets)
+        self.ids[state_set] = state_id
+        self.state_sets.append(state_set)
+        self.transitions.append(dict())
+        self.accepting.append(any(map(self.nfa.is_accept, state_set)))
+
+        return state_id
+
+    # returns the id of the start DFA state(the one containing only the start state of the NFA)
+    def start_state(self) -> int:
+        return self.intern(frozenset([0]))
+
+    # returns the DFA state reached from the given one with the given symbol.
+    # transitions are stored per symbol class, so symbols of the same class share them
+    def next_state(self, current_state : int, symbol : str) -> int:
+        symbol = self.nfa.classes.get(symbol, symbol)
+        try:
+            return self.transitions[current_state][symbol]
+        except KeyError:
+            pass
+
+        # transition isn't in the table yet: compute the union of NFA moves once and remember it
+        new_state_set = set()
+        for nfa_state in self.state_sets[current_state]:
+            new_state_set.update(self.nfa.next_states(nfa_state, symbol))
+
+        # interning may flush the cache, so only record the transition if the current state survived
+        cache_generation = self.transitions
+        new_state = self.intern(frozenset(new_state_set))
+        if cache_generation is self.transitions:
+            self.transitions[current_state][symbol] = new_state
+
+        return new_state
+
+    # returns True if the given DFA state is an accept state
+    def is_accept(self, current_state : int) -> bool:
+        return self.accepting[current_state]
+
+    # returns True if the given DFA state has no NFA states left, so nothing that follows can be accepted
+    def is_dead(self, current_state : int) -> bool:
+        return len(self.state_sets[current_state]) == 0
+
+
+class BitParallelNFA:
+    """Simulates an epsilon-free NFA keeping the set of possible states as the bits of a single int.
+    The states are split into chunks of 8, and the successor mask of a chunk value(the states of the chunk that are
+    active) is computed from the transitions of the NFA the first time it shows up with a symbol, then remembered.
+    One step is a lookup and an OR for every chunk with active states. Only the chunk values that the input
+    actually produces are kept, at most cache_size of them, so memory stays linear in the amount of states."""
+
+    # amount of states in one chunk, the states of a chunk are one byte of the mask
+    CHUNK_BITS = 8
+
+    # initializes the simulator for the given NFA. at most cache_size chunk successor masks are kept at a time
+    def __init__(self, nfa : NFA, cache_size : int = BIT_PARALLEL_CACHE_SIZE) -> None:
+        self.nfa = nfa
+        self.cache_size = cache_size
+        self.n_chunks = (len(nfa.states) + BitParallelNFA.CHUNK_BITS - 1) // BitParallelNFA.CHUNK_BITS
+        # the start state is state 0
+        self.start_mask = 1
+        self.accept_mask = 0
+        for accept_state in nfa.accept_states:
+            self.accept_mask |= 1 << accept_state
+        self.flush()
+
+    # forgets every chunk successor mask computed so far
+    def flush(self):
+        # symbol -> dict(chunk index * 256 + chunk value, mask of the successors of the states in the chunk value)
+        self.tables = dict()
+        self.cached = 0
+
+    # returns the dict of chunk successor masks for the given symbol.
+    # symbols of the same class share the dict of the symbol standing for the class
+    def symbol_table(self, symbol : str) -> dict:
+        try:
+            return self.tables[symbol]
+        except KeyError:
+            pass
+
+        class_symbol = self.nfa.symbol_class(symbol)
+        if class_symbol not in self.tables:
+            self.tables[class_symbol] = dict()
+        self.tables[symbol] = self.tables[class_symbol]
+        return self.tables[symbol]
+
+    # returns the mask of the successors with the given symbol of the states whose bits are set in the chunk value
+    def chunk_successors(self, chunk_index : int, value : int, symbol : str) -> int:
+        targets = set()
+        first_state = chunk_index * BitParallelNFA.CHUNK_BITS
+        while value != 0:
+            lowest_bit = value & -value
+            targets.update(self.nfa.next_states(first_state + lowest_bit.bit_length() - 1, symbol))
+            value ^= lowest_bit
+
+        successors = 0
+        for target in targets:
+            successors |= 1 << target
+        return successors
+
+    # returns the mask of the states reachable from the states in the given mask with the given symbol
+    def next_mask(self, mask : int, symbol : str) -> int:
+        table = self.symbol_table(symbol)
+        chunks = mask.to_bytes(self.n_chunks, "little")
+
+        # only visit the chunks that have active states, jumping over the empty ones
+        new_mask = 0
+        for match in NONZERO_BYTE.finditer(chunks):
+            chunk_index = match.start()
+            key = chunk_index * 256 + chunks[chunk_index]
+            try:
+                new_mask |= table[key]
+                continue
+            except KeyError:
+                pass
+
+            # the cache is full: throw everything away and start over
+            if self.cached >= self.cache_size:
+                self.flush()
+                table = self.symbol_table(symbol)
+            successors = self.chunk_successors(chunk_index, chunks[chunk_index], symbol)
+            table[key] = successors
+            self.cached += 1
+            new_mask |= successors
+
+        return new_mask
+
+    # returns True if at least one of the states in the given mask is an accept state
+    def is_accept(self, mask : int) -> bool:
+        return mask & self.accept_mask != 0
+
+
+class TaggedLazyDFA(LazyDFA):
+    """Lazy DFA over an NFA with accept tags, which also tells the tags of the accept states in every DFA state."""
+
+    def flush(self):
+        super().flush()
+        # DFA state id -> frozenset of the tags of its NFA states
+        self.tags = []
+
+    def intern(self, state_set : frozenset) -> int:
+        state_id = super().intern(state_set)
+
+        # the DFA state is new
+        if state_id == len(self.tags):
+            tags = set()
+            for nfa_state in state_set:
+                tags.update(self.nfa.accept_tags.get(nfa_state, ()))
+            self.tags.append(frozenset(tags))
+
+        return state_id
+
+    # returns the set of tags of the accept states in the given DFA state
+    def state_tags(self, current_state : int) -> frozenset:
+        return self.tags[current_state]
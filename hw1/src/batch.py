@@ -0,0 +1,74 @@
+import numpy as np
+from automata import NFA, SYMBOL_ANY
+
+
+class BatchMatcher:
+    """Runs many strings through one automaton at once.
+    The automaton is turned into a dense minimal DFA table, the strings into a padded matrix of column indices,
+    and all the strings advance together, one vectorized table lookup per position."""
+
+    # initializes the matcher for the given NFA. NFA MUST NOT HAVE EPSILON TRANSITIONS
+    def __init__(self, nfa : NFA) -> None:
+        alphabet, table, accepting = nfa.dfa_table(minimal=True)
+
+        # one extra state that loops to itself on every symbol and never accepts, and one extra column leading to it.
+        # symbols outside the alphabet go to the SYMBOL_ANY column if there is one, otherwise to the extra column
+        n_states = len(table)
+        self.other_column = alphabet.index(SYMBOL_ANY) if SYMBOL_ANY in alphabet else len(alphabet)
+        self.table = np.full((n_states + 1, len(alphabet) + 1), n_states, dtype=np.int32)
+        if len(alphabet) > 0:
+            self.table[:n_states, :len(alphabet)] = np.array(table, dtype=np.int32).reshape(n_states, len(alphabet))
+        self.accepting = np.zeros(n_states + 1, dtype=bool)
+        self.accepting[:n_states] = accepting
+
+        # maps code points to columns: symbols of a class share the column of the symbol standing for it.
+        # code points past the end of it all go to the other column
+        max_code_point = max((ord(symbol) for symbol in list(alphabet) + list(nfa.classes)), default=0)
+        self.columns = np.full(max_code_point + 2, self.other_column, dtype=np.int32)
+        for symbol_index, symbol in enumerate(alphabet):
+            self.columns[ord(symbol)] = symbol_index
+        for symbol, class_symbol in nfa.classes.items():
+            if class_symbol in alphabet:
+                self.columns[ord(symbol)] = alphabet.index(class_symbol)
+
+    # returns (matrix of column indices, one row per string, padded with the extra column; array of string lengths)
+    def encode(self, strings) -> tuple:
+        if isinstance(strings, np.ndarray) and strings.dtype.kind == 'U':
+            # fixed width unicode arrays already are a padded matrix of code points
+            lengths = np.char.str_len(strings).astype(np.int64).ravel()
+            width = max(strings.dtype.itemsize // 4, 1)
+            code_points = np.ascontiguousarray(strings).ravel().view(np.uint32).reshape(len(lengths), width)
+            code_points = code_points[:, :max(int(lengths.max(initial=0)), 1)]
+            padding = np.arange(code_points.shape[1]) >= lengths[:, None]
+        else:
+            strings = [str(string) for string in strings]
+            lengths = np.array([len(string) for string in strings], dtype=np.int64)
+            flat = np.frombuffer("".join(strings).encode("utf-32-le"), dtype=np.uint32)
+            code_points = np.zeros((len(strings), max(int(lengths.max(initial=0)), 1)), dtype=np.uint32)
+            padding = np.arange(code_points.shape[1]) >= lengths[:, None]
+            code_points[~padding] = flat
+
+        codes = self.columns[np.minimum(code_points, len(self.columns) - 1)]
+        codes[padding] = self.table.shape[1] - 1
+
+        return codes, lengths
+
+    # returns the list of per-prefix Y/N answers for every string, same as nfa_result would give for each of them
+    def match(self, strings) -> list:
+        codes, lengths = self.encode(strings)
+        n_strings, width = codes.shape
+
+        # advance all the strings together, one position at a time
+        current_states = np.zeros(n_strings, dtype=np.int32)
+        accepted = np.empty((n_strings, width), dtype=bool)
+        for position in range(width):
+            current_states = self.table[current_states, codes[:, position]]
+            accepted[:, position] = self.accepting[current_states]
+
+        answers = np.where(accepted, ord('Y'), ord('N')).astype(np.uint8)
+        return [answers[string_index, :lengths[string_index]].tobytes().decode("ascii") for string_index in range(n_strings)]
+
+
+# returns the list of per-prefix Y/N answers for every one of the given strings(a list or a numpy array of strings)
+def batch_result(nfa : NFA, strings) -> list:
+    return BatchMatcher(nfa).match(strings)
@@ -1,105 +1,450 @@
+import argparse
+from array import array
 from curses.ascii import isalnum
 from automata import NFA, SYMBOL_EPSILON, SYMBOL_ANY
+from cache import AutomatonCache
+from compact import CompactNFA
 
-# check if the given expression is a single character of the expression/NFA alphabet
+# check if the given expression is a single character of the expression/NFA alphabet.
+# the characters used as special symbols of NFA can't be matched literally
 def is_unit(exp):
-    if len(exp) == 1 and exp.__class__.__name__ == "str" and isalnum(exp):
+    if len(exp) == 1 and exp.__class__.__name__ == "str" and isalnum(exp) and exp not in (SYMBOL_ANY, SYMBOL_EPSILON):
         return True
     
     return False
 
 
+# operators of the postfix form of a regular expression.
+# concatenation has no symbol of its own in the regex, so it gets a name that can't be mistaken for a unit
+OP_UNION = '|'
+OP_STAR = '*'
+OP_CONCAT = "concat"
+# the wildcard of regular expressions, matches any single symbol. it becomes SYMBOL_ANY in the postfix form
+WILDCARD = '.'
+# character classes like [a-z0-9] match any single symbol listed between the brackets. they become frozensets
+# of their symbols in the postfix form
+CLASS_OPEN = '['
+CLASS_CLOSE = ']'
+CLASS_RANGE = '-'
+# binding strength of the binary operators. Kleene closure binds the strongest, but it never waits on the stack
+PRECEDENCE = {OP_UNION : 1, OP_CONCAT : 2}
+
+
+# parses the character class starting with the opening bracket at the given index of the regex.
+# members are units or ranges like a-z(every unit between the two ends, inclusive, the ends can be any letter or digit).
+# the special symbols of NFA can't be members, same as they can't be units, ranges skip them.
+# returns (frozenset of the symbols of the class, index right after the closing bracket)
+def parse_class(regex : str, index : int) -> tuple:
+    # checks that the character at the given position can be a member of a class(or, with bound, an end of a range)
+    def member(position, bound = False):
+        if position >= len(regex) or not (is_unit(regex[position]) or bound and isalnum(regex[position])):
+            raise ValueError("expected a symbol at position " + str(position) + " of the regular expression")
+        return regex[position]
+
+    symbols = set()
+    position = index + 1
+    while position < len(regex) and regex[position] != CLASS_CLOSE:
+        if position + 1 < len(regex) and regex[position + 1] == CLASS_RANGE:
+            first = member(position, True)
+            last = member(position + 2, True)
+            if ord(last) < ord(first):
+                raise ValueError("range out of order at position " + str(position) + " of the regular expression")
+            # only the characters that could be members on their own, so A-Z is every capital letter but the special symbols
+            members = [chr(code_point) for code_point in range(ord(first), ord(last) + 1) if is_unit(chr(code_point))]
+            if len(members) == 0:
+                raise ValueError("range at position " + str(position) + " of the regular expression has no symbols")
+            symbols.update(members)
+            position += 3
+        else:
+            symbols.add(member(position))
+            position += 1
+
+    if position >= len(regex):
+        raise ValueError("unmatched '" + CLASS_OPEN + "' at position " + str(index) + " of the regular expression")
+    if len(symbols) == 0:
+        raise ValueError("empty character class at position " + str(index) + " of the regular expression")
+
+    return frozenset(symbols), position + 1
+
+# convert the given regular expression into postfix form(a list of units and operators) in a single pass.
+# uses the shunting-yard algorithm, with an explicit stack instead of recursion, so nesting depth doesn't matter.
+# raises ValueError if the expression is malformed
+def to_postfix(regex : str) -> list:
+    postfix = []
+    # operators and opening brackets waiting for their right operand/closing bracket
+    operators = []
+    # True while the next token has to start an operand(a unit or an opening bracket)
+    expecting_operand = True
+
+    # moves the operators from the stack to the output as long as they bind at least as strongly as the given one
+    def pop_operators(precedence):
+        while len(operators) > 0 and operators[-1] != '(' and PRECEDENCE[operators[-1]] >= precedence:
+            postfix.append(operators.pop())
+
+    index = 0
+    while index < len(regex):
+        c = regex[index]
+        if not expecting_operand and (is_unit(c) or c in (WILDCARD, CLASS_OPEN, '(')):
+            # two operands next to each other: there's a concatenation between them
+            pop_operators(PRECEDENCE[OP_CONCAT])
+            operators.append(OP_CONCAT)
+            expecting_operand = True
+
+        if is_unit(c):
+            postfix.append(c)
+            expecting_operand = False
+        elif c == WILDCARD:
+            postfix.append(SYMBOL_ANY)
+            expecting_operand = False
+        elif c == CLASS_OPEN:
+            symbols, index = parse_class(regex, index)
+            postfix.append(symbols)
+            expecting_operand = False
+            continue
+        elif c == '(':
+            operators.append(c)
+        elif expecting_operand:
+            raise ValueError("expected a symbol or '(' at position " + str(index) + " of the regular expression")
+        elif c == OP_STAR:
+            postfix.append(c)
+        elif c == OP_UNION:
+            pop_operators(PRECEDENCE[OP_UNION])
+            operators.append(c)
+            expecting_operand = True
+        elif c == ')':
+            pop_operators(0)
+            if len(operators) == 0:
+                raise ValueError("unmatched ')' at position " + str(index) + " of the regular expression")
+            # get rid of the matching opening bracket
+            operators.pop()
+        else:
+            raise ValueError("unexpected character " + repr(c) + " at position " + str(index) + " of the regular expression")
+        index += 1
+
+    if expecting_operand:
+        raise ValueError("the regular expression ends where a symbol or '(' is expected")
+
+    pop_operators(0)
+    if len(operators) > 0:
+        raise ValueError("unmatched '(' in the regular expression")
+
+    return postfix
+
+
+# computes the symbol classes for the given postfix forms. symbols that belong to exactly the same units and
+# character classes can't be told apart by any automaton built from them, so a single symbol can stand for all of them.
+# returns dict(symbol, symbol standing for its class) for the symbols that don't stand for themselves
+def symbol_classes(postfixes : list) -> dict:
+    # the indices of the symbol sets(units or character classes) that every symbol belongs to
+    memberships = dict()
+    n_sets = 0
+    for postfix in postfixes:
+        for token in postfix:
+            if isinstance(token, frozenset):
+                symbols = token
+            elif is_unit(token):
+                symbols = (token,)
+            else:
+                continue
+
+            for symbol in symbols:
+                memberships.setdefault(symbol, []).append(n_sets)
+            n_sets += 1
+
+    groups = dict()
+    for symbol, sets in memberships.items():
+        groups.setdefault(tuple(sets), []).append(symbol)
+
+    classes = dict()
+    for group in groups.values():
+        class_symbol = min(group)
+        for symbol in group:
+            if symbol != class_symbol:
+                classes[symbol] = class_symbol
+
+    return classes
+
+
+class ThompsonBuilder:
+    """Builds NFA-s with Thompson's algorithm in a single growing arena of states.
+    A fragment is a (start state, accept state) pair. Operations on fragments only add a constant amount of
+    states and epsilon transitions, nothing ever gets renumbered. State 0 is reserved for the start state of the NFA.
+    Transitions use the symbols standing for the symbol classes(see symbol_classes) in place of the symbols."""
+
+    def __init__(self, classes : dict = None) -> None:
+        self.classes = dict() if classes is None else classes
+        self.n_states = 0
+        # symbols get interned, edges refer to them by index
+        self.symbols = []
+        self.symbol_ids = dict()
+        # edge e goes from sources[e] to targets[e] with symbol symbols[edge_symbols[e]]
+        self.sources = array('i')
+        self.edge_symbols = array('i')
+        self.targets = array('i')
+        self.add_state()
+
+    # adds a new state and returns its index
+    def add_state(self) -> int:
+        self.n_states += 1
+        return self.n_states - 1
+
+    # adds a transition from source to target with the given symbol
+    def add_transition(self, source : int, symbol : str, target : int):
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+        self.sources.append(source)
+        self.edge_symbols.append(self.symbol_ids[symbol])
+        self.targets.append(target)
+
+    # returns a fragment matching just the given symbol
+    def symbol(self, symbol : str) -> tuple:
+        start = self.add_state()
+        accept = self.add_state()
+        self.add_transition(start, symbol, accept)
+        return start, accept
+
+    # returns a fragment matching any single symbol of the given character class
+    def symbol_set(self, symbols : frozenset) -> tuple:
+        start = self.add_state()
+        accept = self.add_state()
+        for class_symbol in sorted(set(self.classes.get(symbol, symbol) for symbol in symbols)):
+            self.add_transition(start, class_symbol, accept)
+        return start, accept
+
+    # returns a fragment matching either of the given fragments
+    def union(self, fragment : tuple, other : tuple) -> tuple:
+        start = self.add_state()
+        accept = self.add_state()
+        for start_state, accept_state in (fragment, other):
+            self.add_transition(start, SYMBOL_EPSILON, start_state)
+            self.add_transition(accept_state, SYMBOL_EPSILON, accept)
+        return start, accept
+
+    # returns a fragment matching the Kleene closure of the given fragment
+    def kleene_closure(self, fragment : tuple) -> tuple:
+        start = self.add_state()
+        accept = self.add_state()
+        self.add_transition(start, SYMBOL_EPSILON, fragment[0])
+        self.add_transition(start, SYMBOL_EPSILON, accept)
+        self.add_transition(fragment[1], SYMBOL_EPSILON, fragment[0])
+        self.add_transition(fragment[1], SYMBOL_EPSILON, accept)
+        return start, accept
+
+    # returns a fragment matching the concatenation of the given fragments
+    def concatenation(self, fragment : tuple, other : tuple) -> tuple:
+        self.add_transition(fragment[1], SYMBOL_EPSILON, other[0])
+        return fragment[0], other[1]
+
+    # returns a fragment for the regular expression given in postfix form(see to_postfix)
+    def fragment(self, postfix : list) -> tuple:
+        # evaluate the postfix form with a stack of fragments for the operands
+        stack = []
+        for token in postfix:
+            if token == OP_STAR:
+                stack[-1] = self.kleene_closure(stack[-1])
+            elif token == OP_CONCAT:
+                other = stack.pop()
+                stack[-1] = self.concatenation(stack[-1], other)
+            elif token == OP_UNION:
+                other = stack.pop()
+                stack[-1] = self.union(stack[-1], other)
+            elif isinstance(token, frozenset):
+                stack.append(self.symbol_set(token))
+            else:
+                stack.append(self.symbol(token))
+
+        return stack[0]
+
+    # returns everything built so far as an NFA of the given class(NFA or CompactNFA) with the given accept states
+    def nfa(self, accept_states, nfa_class = NFA):
+        nfa = nfa_class.from_edges(self.symbols, self.n_states, self.sources, self.edge_symbols, self.targets, accept_states)
+        nfa.classes = dict(self.classes)
+        return nfa
+
+
+# returns the union of the given sets, reusing the larger one. both of them may be changed
+def merge(first : set, second : set) -> set:
+    if len(first) < len(second):
+        first, second = second, first
+    first.update(second)
+    return first
+
+
+class GlushkovBuilder:
+    """Builds the position automaton of a regular expression(Glushkov's algorithm), which has no epsilon transitions.
+    Every unit, character class and wildcard of the expression is a position and gets a state of its own,
+    state 0 is the start state. A fragment is a (nullable, first positions, last positions) triple:
+    whether the subexpression matches the empty string, and the positions its matches can start and end with.
+    Which positions can follow each other is collected while the fragments are combined."""
+
+    def __init__(self, classes : dict = None) -> None:
+        self.classes = dict() if classes is None else classes
+        # labels[position] is the list of symbols that lead into the position. position 0 is the start state
+        self.labels = [[]]
+        # follow[position] is the set of positions that can come right after the position
+        self.follow = [set()]
+
+    # returns a fragment for a new position that is entered with the given symbols
+    def position(self, symbols) -> tuple:
+        position = len(self.labels)
+        self.labels.append(sorted(set(self.classes.get(symbol, symbol) for symbol in symbols)))
+        self.follow.append(set())
+        return False, set([position]), set([position])
+
+    # returns a fragment matching either of the given fragments
+    def union(self, fragment : tuple, other : tuple) -> tuple:
+        return fragment[0] or other[0], merge(fragment[1], other[1]), merge(fragment[2], other[2])
+
+    # returns a fragment matching the Kleene closure of the given fragment
+    def kleene_closure(self, fragment : tuple) -> tuple:
+        for position in fragment[2]:
+            self.follow[position].update(fragment[1])
+        return True, fragment[1], fragment[2]
+
+    # returns a fragment matching the concatenation of the given fragments
+    def concatenation(self, fragment : tuple, other : tuple) -> tuple:
+        for position in fragment[2]:
+            self.follow[position].update(other[1])
+        first = merge(fragment[1], other[1]) if fragment[0] else fragment[1]
+        last = merge(fragment[2], other[2]) if other[0] else other[2]
+        return fragment[0] and other[0], first, last
+
+    # returns a fragment for the regular expression given in postfix form(see to_postfix)
+    def fragment(self, postfix : list) -> tuple:
+        stack = []
+        for token in postfix:
+            if token == OP_STAR:
+                stack[-1] = self.kleene_closure(stack[-1])
+            elif token == OP_CONCAT:
+                other = stack.pop()
+                stack[-1] = self.concatenation(stack[-1], other)
+            elif token == OP_UNION:
+                other = stack.pop()
+                stack[-1] = self.union(stack[-1], other)
+            elif isinstance(token, frozenset):
+                stack.append(self.position(token))
+            else:
+                stack.append(self.position([token]))
+
+        return stack[0]
+
+    # returns the position automaton of the given fragment as an NFA of the given class(NFA or CompactNFA)
+    def nfa(self, fragment : tuple, nfa_class = NFA):
+        nullable, first, last = fragment
+        self.follow[0] = first
+
+        # transitions of every state in the list of dicts form: a position is entered with the symbols of its label
+        states = []
+        for positions in self.follow:
+            transitions = dict()
+            for position in positions:
+                for symbol in self.labels[position]:
+                    transitions.setdefault(symbol, set()).add(position)
+
+            # SYMBOL_ANY transitions are only taken for symbols without transitions of their own,
+            # so the symbols that have them need the targets of SYMBOL_ANY as well
+            if SYMBOL_ANY in transitions:
+                for symbol in transitions:
+                    transitions[symbol].update(transitions[SYMBOL_ANY])
+            states.append(transitions)
+
+        accept_states = set(last)
+        if nullable:
+            accept_states.add(0)
+
+        nfa = NFA(states, accept_states, classes=dict(self.classes))
+        return nfa if nfa_class is NFA else nfa_class.from_nfa(nfa)
+
 # construct and return an NFA matching the given regular expression
+# NFA returned by this function may be unoptimized. nfa_class can be NFA or CompactNFA
+def construct(regex : str, nfa_class = NFA) -> NFA:
+    postfix = to_postfix(regex)
+    builder = ThompsonBuilder(symbol_classes([postfix]))
+    start, accept = builder.fragment(postfix)
+    # the reserved start state leads into the fragment
+    builder.add_transition(0, SYMBOL_EPSILON, start)
+
+    return builder.nfa([accept], nfa_class)
+
+# construct and return the position automaton of the given regular expression. it has no epsilon transitions
+# and a state for every unit, character class and wildcard plus the start state. nfa_class can be NFA or CompactNFA
+def construct_glushkov(regex : str, nfa_class = NFA) -> NFA:
+    postfix = to_postfix(regex)
+    builder = GlushkovBuilder(symbol_classes([postfix]))
+    return builder.nfa(builder.fragment(postfix), nfa_class)
+
+# construct and return an NFA matching any of the given regular expressions.
+# accept states are tagged(NFA.accept_tags) with the indices of the expressions that they match.
 # NFA returned by this function may be unoptimized
-def construct(regex : str) -> NFA:
-    # base case: when the given expression is a single symbol
-    if is_unit(regex):
-        # 0 is start state, 1 is accept state.
-        # args: ([dict with the given symbol mapping to just 1, empty dict], set of just 1(accept state))
-        return NFA([{regex:set([1])}, {}], set([1]))
+def construct_set(regexes : list) -> NFA:
+    postfixes = [to_postfix(regex) for regex in regexes]
+    builder = ThompsonBuilder(symbol_classes(postfixes))
+    accept_tags = dict()
+    for regex_index, postfix in enumerate(postfixes):
+        start, accept = builder.fragment(postfix)
+        # the reserved start state leads into the fragments of all the expressions
+        builder.add_transition(0, SYMBOL_EPSILON, start)
+        accept_tags[accept] = set([regex_index])
+
+    nfa = builder.nfa(accept_tags.keys())
+    nfa.accept_tags = accept_tags
+    return nfa
+
+# construct an NFA matching the given regular expression and run the optimization passes on it.
+# minimize turns it into the minimal DFA, compact builds it as a CompactNFA(the result is then a CompactNFA too,
+# unless it's minimized), glushkov builds the position automaton, which needs no epsilon removal
+def compile_regex(regex : str, minimize : bool = False, compact : bool = False, glushkov : bool = False):
+    if glushkov:
+        nfa = construct_glushkov(regex, CompactNFA if compact else NFA)
     else:
-        # convert regex to a list
-        regex = list(regex)
-        # construct an NFA for all single letters
-        for index, c in enumerate(regex):
-            # this means that this is a recursive call and we've gone through this loop already
-            if c.__class__.__name__ == "NFA":
-                break
-            
-            if is_unit(c):
-                regex[index] = construct(c)
-
-        # recursively evaluate anything that's in brackets
-        while True:
-            try:
-                bracket_index = regex.index('(')
-            except:
-                break
-            
-            open_bracket_count = 0
-            for i in range(bracket_index + 1, len(regex)):
-                if regex[i].__class__.__name__ == "str": 
-                    if regex[i] == ')':
-                        if open_bracket_count == 0:
-                            close_bracket_index = i
-                            break
-                        else:
-                            open_bracket_count -= 1
-                    elif regex[i] == '(':
-                        open_bracket_count += 1
-
-            in_bracket_ex = regex[bracket_index + 1 : close_bracket_index]
-            nfa_for_in_bracket = construct(in_bracket_ex)
-
-            new_regex = regex[:bracket_index]
-            new_regex.append(nfa_for_in_bracket)
-            new_regex += regex[close_bracket_index + 1:]
-
-            regex = list(new_regex)
-
-        # take care of kleene closure operations
-        pos = 0
-        while True:
-            try:
-                pos = regex.index('*', pos)
-            except:
-                break
-
-            new_regex = regex[:pos - 1]
-            new_regex.append(regex[pos - 1].kleene_closure())
-            new_regex += regex[pos + 1:]
-
-            regex = new_regex
-
-        # take care of concatenation operations
-        pos = 0
-        while True:
-            try:
-                if regex[pos + 1] == '|':
-                    pos += 2
-                    continue
-
-                new_regex = regex[:pos]
-                new_regex.append(regex[pos].concatenation(regex[pos + 1]))
-                new_regex += regex[pos + 2:]
-
-                regex = new_regex
-
-            except IndexError:
-                break
-
-        # take care of union operations
-        for i in range(2, len(regex), 2):
-            regex[0] = regex[0].union(regex[i])
-
-        res = regex[0]
-        
-        return res
+        nfa = construct(regex, CompactNFA if compact else NFA).remove_epsilon().remove_unreachable()
+    if minimize:
+        # minimization works on the list of dicts form
+        if compact:
+            nfa = nfa.to_nfa()
+        nfa = nfa.minimize()
+
+    return nfa
+
+# same as compile_regex, but returns the string representation of the automaton
+# and skips the compilation if the cache already has it
+def compile_cached(regex : str, cache : AutomatonCache, **options) -> str:
+    text = cache.get(regex, options)
+    if text is None:
+        text = compile_regex(regex, **options).to_string()
+        cache.put(regex, options, text)
+
+    return text
 
 def main():
+    parser = argparse.ArgumentParser(description="Reads a regular expression and prints an automaton matching it.")
+    parser.add_argument("--minimize", action="store_true", help="convert the automaton into the minimal DFA")
+    parser.add_argument("--compact", action="store_true", help="build the automaton in the array-backed form(uses less memory)")
+    parser.add_argument("--glushkov", action="store_true", help="build the position automaton instead of Thompson's, no epsilon removal needed")
+    parser.add_argument("--cache-dir", help="directory to keep compiled automata in, so that compiling the same regex again is just a lookup")
+    parser.add_argument("--binary", metavar="PATH", help="write the automaton to the given file in the binary form instead of printing it")
+    args = parser.parse_args()
+
     regex = input()
-    nfa = construct(regex).remove_epsilon().remove_unreachable()
-    print(nfa.to_string())
+    if args.cache_dir is None:
+        nfa = compile_regex(regex, args.minimize, args.compact, args.glushkov)
+        text = None
+    else:
+        text = compile_cached(regex, AutomatonCache(args.cache_dir), minimize=args.minimize, compact=args.compact, glushkov=args.glushkov)
+        nfa = None
+
+    if args.binary is None:
+        print(nfa.to_string() if text is None else text)
+        return
+
+    if nfa is None:
+        nfa = NFA.from_string(text)
+    if not isinstance(nfa, CompactNFA):
+        nfa = CompactNFA.from_nfa(nfa)
+    with open(args.binary, "wb") as binary_file:
+        binary_file.write(nfa.to_bytes())
 
 if __name__ == "__main__":
     main()
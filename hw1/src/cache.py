@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+# bump whenever the format of cached automata or the passes that produce them change, old entries are ignored then
+# 1: plain automata
+# 2: accept tags of regex sets, the SYMBOL_ANY default transitions of '.', character classes
+CACHE_FORMAT_VERSION = 2
+# first line of every file of the on-disk cache
+CACHE_HEADER = "nfa-cache " + str(CACHE_FORMAT_VERSION)
+CACHE_FILE_SUFFIX = ".nfa"
+# default amount of automata kept in memory
+CACHE_MEMORY_ENTRIES = 256
+# default limit for the total size of the on-disk cache
+CACHE_DISK_BYTES = 64 << 20
+
+
+class AutomatonCache:
+    """Cache of compiled automata in the form given by NFA.to_string, keyed by the regex and the compilation options.
+    Recently used entries are kept in memory. If a directory is given, entries are also stored there as files named
+    after the key, so that they survive between processes. Files are written to a temporary name and renamed,
+    so concurrent writers never leave a partial entry behind. When the directory grows past its size limit,
+    the least recently used files are deleted."""
+
+    def __init__(self, directory : str = None, memory_entries : int = CACHE_MEMORY_ENTRIES, disk_bytes : int = CACHE_DISK_BYTES) -> None:
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        # key -> text, least recently used first
+        self.memory = OrderedDict()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # returns the key for the given regex and options(a dict of the options the automaton was compiled with)
+    @staticmethod
+    def key(regex : str, options : dict) -> str:
+        description = CACHE_HEADER + "\n" + repr(sorted(options.items())) + "\n" + regex
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    # returns the cached automaton text for the given regex and options, or None if there's none
+    def get(self, regex : str, options : dict):
+        key = AutomatonCache.key(regex, options)
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        if self.directory is None:
+            return None
+
+        text = self.__read(key)
+        if text is not None:
+            self.__remember(key, text)
+
+        return text
+
+    # stores the automaton text for the given regex and options
+    def put(self, regex : str, options : dict, text : str):
+        key = AutomatonCache.key(regex, options)
+        self.__remember(key, text)
+
+        if self.directory is not None:
+            self.__write(key, text)
+            self.__evict()
+
+    # adds the entry to the in-memory tier, dropping the least recently used entry if there are too many
+    def __remember(self, key : str, text : str):
+        self.memory[key] = text
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    # returns the path of the file for the given key
+    def __path(self, key : str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    # returns the text stored on disk for the given key, or None if there's no valid entry
+    def __read(self, key : str):
+        path = self.__path(key)
+        try:
+            with open(path, encoding="utf-8") as cache_file:
+                header, _, text = cache_file.read().partition("\n")
+        # another process might have evicted the file in the meantime
+        except FileNotFoundError:
+            return None
+
+        # entry of another format version: pretend it's not there, it will be overwritten
+        if header != CACHE_HEADER:
+            return None
+
+        # mark the entry as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return text
+
+    # stores the text on disk for the given key, atomically
+    def __write(self, key : str, text : str):
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as cache_file:
+                cache_file.write(CACHE_HEADER + "\n" + text)
+            os.replace(temporary_path, self.__path(key))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    # deletes the least recently used files until the on-disk cache fits in its size limit
+    def __evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        entries.sort()
+        for modification_time, size, path in entries:
+            if total_size <= self.disk_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
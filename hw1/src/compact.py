@@ -0,0 +1,361 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from automata import NFA, SYMBOL_ANY, SYMBOL_EPSILON, strongly_connected_components, class_groups
+
+# binary format: header, then the symbols as utf-8, then the symbol classes as utf-8(every symbol that belongs
+# to a class, then the symbols standing for their classes in the same order), both padded with zero bytes
+# to a multiple of 4, then offsets, edge symbols and targets as little endian 32 bit ints, then the accept bitset
+BINARY_MAGIC = b"NFAB"
+BINARY_VERSION = 2
+# magic, version, state count, symbol count, edge count, length of the encoded symbols in bytes,
+# count of symbols in classes, length of the encoded classes in bytes
+BINARY_HEADER = struct.Struct("<4sIIIIIII")
+
+
+# returns an array('i') of the given length filled with zeros
+def zeros(length : int) -> array:
+    return array('i', [0]) * length
+
+
+class CompactNFA:
+    """NFA stored in flat arrays instead of a list of dicts of sets.
+    Symbols are interned: symbols[i] is the symbol with id i.
+    Transitions of state i are the edges offsets[i] to offsets[i + 1] - 1, sorted by symbol id:
+    edge e goes to state targets[e] with the symbol that has id edge_symbols[e].
+    Accept states are a bitset: bit i of accept is set if state i is an accept state.
+    Symbol classes are kept the same way as by NFA."""
+
+    """Constructor"""
+
+    # initializes the NFA with the given arrays. see the class description for what they mean
+    def __init__(self, symbols : list, offsets : array, edge_symbols : array, targets : array, accept : bytearray, classes : dict = None) -> None:
+        self.symbols = symbols
+        self.symbol_ids = {symbol : symbol_id for symbol_id, symbol in enumerate(symbols)}
+        self.offsets = offsets
+        self.edge_symbols = edge_symbols
+        self.targets = targets
+        self.accept = accept
+        self.classes = dict() if classes is None else classes
+
+    # builds the NFA from a list of edges given as three arrays of the same length(edge e goes from sources[e]
+    # to targets[e] with symbol id edge_symbols[e]). duplicate edges are dropped
+    @classmethod
+    def from_edges(cls, symbols : list, n_states : int, sources : array, edge_symbols : array, targets : array, accept_states) -> "CompactNFA":
+        # counting sort of the edges by their source state
+        counts = zeros(n_states + 1)
+        for source in sources:
+            counts[source + 1] += 1
+        for state_index in range(n_states):
+            counts[state_index + 1] += counts[state_index]
+
+        positions = array('i', counts)
+        sorted_symbols = zeros(len(sources))
+        sorted_targets = zeros(len(sources))
+        for edge_index, source in enumerate(sources):
+            position = positions[source]
+            positions[source] += 1
+            sorted_symbols[position] = edge_symbols[edge_index]
+            sorted_targets[position] = targets[edge_index]
+
+        # sort the edges of every state by symbol and get rid of duplicates
+        offsets = zeros(n_states + 1)
+        new_symbols = array('i')
+        new_targets = array('i')
+        for state_index in range(n_states):
+            start = counts[state_index]
+            end = counts[state_index + 1]
+            if end - start > 1:
+                edges = sorted(set(zip(sorted_symbols[start : end], sorted_targets[start : end])))
+                for symbol_id, target in edges:
+                    new_symbols.append(symbol_id)
+                    new_targets.append(target)
+            else:
+                new_symbols.extend(sorted_symbols[start : end])
+                new_targets.extend(sorted_targets[start : end])
+            offsets[state_index + 1] = len(new_targets)
+
+        accept = bytearray((n_states + 7) // 8)
+        for accept_state in accept_states:
+            accept[accept_state >> 3] |= 1 << (accept_state & 7)
+
+        return cls(symbols, offsets, new_symbols, new_targets, accept)
+
+    # returns a compact copy of the given NFA
+    @classmethod
+    def from_nfa(cls, nfa : NFA) -> "CompactNFA":
+        symbols = set()
+        for state in nfa.states:
+            symbols.update(state)
+        symbols = sorted(symbols)
+        symbol_ids = {symbol : symbol_id for symbol_id, symbol in enumerate(symbols)}
+
+        sources = array('i')
+        edge_symbols = array('i')
+        targets = array('i')
+        for state_index, state in enumerate(nfa.states):
+            for symbol in state:
+                for other_state in state[symbol]:
+                    sources.append(state_index)
+                    edge_symbols.append(symbol_ids[symbol])
+                    targets.append(other_state)
+
+        compact = cls.from_edges(symbols, len(nfa.states), sources, edge_symbols, targets, nfa.accept_states)
+        compact.classes = dict(nfa.classes)
+        return compact
+
+    # returns a copy of self in the list of dicts form
+    def to_nfa(self) -> NFA:
+        states = []
+        for state_index in range(self.state_count()):
+            state = dict()
+            for edge_index in range(self.offsets[state_index], self.offsets[state_index + 1]):
+                symbol = self.symbols[self.edge_symbols[edge_index]]
+                if symbol not in state:
+                    state[symbol] = set()
+                state[symbol].add(self.targets[edge_index])
+            states.append(state)
+
+        return NFA(states, set(self.accept_state_list()), classes=dict(self.classes))
+
+
+    """Operations for optimizing NFA"""
+
+    # replaces all epsilon transitions from self and returns the result. same result as NFA.remove_epsilon
+    def remove_epsilon(self):
+        if SYMBOL_EPSILON not in self.symbol_ids:
+            return self
+
+        epsilon = self.symbol_ids[SYMBOL_EPSILON]
+        n_states = self.state_count()
+
+        # returns the states the given state has epsilon transitions to
+        def epsilon_targets(state_index):
+            return [self.targets[edge_index] for edge_index in range(self.offsets[state_index], self.offsets[state_index + 1])
+                    if self.edge_symbols[edge_index] == epsilon]
+
+        components, component_of = strongly_connected_components(n_states, epsilon_targets)
+
+        # the symbol transitions of the whole closure of every component, as a set of (symbol id, target) pairs.
+        # components that we have epsilon transitions to come first, so their closures are ready when we need them
+        merged = []
+        merged_accept = []
+        for component_index, component in enumerate(components):
+            edges = set()
+            is_accept = False
+            successors = set()
+            for state_index in component:
+                for edge_index in range(self.offsets[state_index], self.offsets[state_index + 1]):
+                    if self.edge_symbols[edge_index] == epsilon:
+                        successors.add(component_of[self.targets[edge_index]])
+                    else:
+                        edges.add((self.edge_symbols[edge_index], self.targets[edge_index]))
+
+                is_accept = is_accept or self.is_accept(state_index)
+
+            successors.discard(component_index)
+            for successor in successors:
+                edges.update(merged[successor])
+                is_accept = is_accept or merged_accept[successor]
+
+            # default transitions also apply to the symbols that other states of the closure have transitions for
+            any_id = self.symbol_ids.get(SYMBOL_ANY)
+            default_targets = [target for symbol_id, target in edges if symbol_id == any_id]
+            if len(default_targets) > 0:
+                for symbol_id in set(symbol_id for symbol_id, target in edges):
+                    edges.update((symbol_id, target) for target in default_targets)
+
+            merged.append(edges)
+            merged_accept.append(is_accept)
+
+        offsets = zeros(n_states + 1)
+        edge_symbols = array('i')
+        targets = array('i')
+        accept_states = []
+        for state_index in range(n_states):
+            component_index = component_of[state_index]
+            for symbol_id, target in sorted(merged[component_index]):
+                edge_symbols.append(symbol_id)
+                targets.append(target)
+            offsets[state_index + 1] = len(targets)
+
+            if merged_accept[component_index]:
+                accept_states.append(state_index)
+
+        self.offsets = offsets
+        self.edge_symbols = edge_symbols
+        self.targets = targets
+        self.accept = bytearray((n_states + 7) // 8)
+        for accept_state in accept_states:
+            self.accept[accept_state >> 3] |= 1 << (accept_state & 7)
+
+        return self
+
+    # removes all the states that are unreachable from the start state and returns the result
+    def remove_unreachable(self):
+        # breadth first search from the start state. states get their new indices in the order they are found
+        new_index = array('i', [-1]) * self.state_count()
+        new_index[0] = 0
+        order = array('i', [0])
+        for state_index in order:
+            for edge_index in range(self.offsets[state_index], self.offsets[state_index + 1]):
+                other_state = self.targets[edge_index]
+                if new_index[other_state] == -1:
+                    new_index[other_state] = len(order)
+                    order.append(other_state)
+
+        # copy the edges of the reachable states in their new order
+        offsets = zeros(len(order) + 1)
+        edge_symbols = array('i')
+        targets = array('i')
+        accept = bytearray((len(order) + 7) // 8)
+        for new_state_index, state_index in enumerate(order):
+            start = self.offsets[state_index]
+            end = self.offsets[state_index + 1]
+            edge_symbols.extend(self.edge_symbols[start : end])
+            targets.extend(new_index[other_state] for other_state in self.targets[start : end])
+            offsets[new_state_index + 1] = len(targets)
+
+            if self.is_accept(state_index):
+                accept[new_state_index >> 3] |= 1 << (new_state_index & 7)
+
+        self.offsets = offsets
+        self.edge_symbols = edge_symbols
+        self.targets = targets
+        self.accept = accept
+
+        return self
+
+
+    """Used for navigating through NFA"""
+
+    # returns the amount of states
+    def state_count(self) -> int:
+        return len(self.offsets) - 1
+
+    # returns the symbol that stands for the equivalence class of the given one, same as NFA.symbol_class
+    def symbol_class(self, symbol : str) -> str:
+        return self.classes.get(symbol, symbol)
+
+    # returns the states reachable from the current state with the given symbol, as a slice of targets.
+    # SYMBOL_ANY transitions are taken if the state has no transitions for the symbol, same as in NFA.
+    # the edges of a state are sorted by symbol id, so the edges of a symbol are found with binary search
+    def next_states(self, current_state : int, symbol : str):
+        symbol = self.classes.get(symbol, symbol)
+        start = self.offsets[current_state]
+        end = self.offsets[current_state + 1]
+        for symbol_id in (self.symbol_ids.get(symbol), self.symbol_ids.get(SYMBOL_ANY)):
+            if symbol_id is None:
+                continue
+            first = bisect_left(self.edge_symbols, symbol_id, start, end)
+            if first < end and self.edge_symbols[first] == symbol_id:
+                return self.targets[first : bisect_right(self.edge_symbols, symbol_id, first, end)]
+
+        return []
+
+    # returns True if the given state is an accept state
+    def is_accept(self, current_state : int) -> bool:
+        return (self.accept[current_state >> 3] >> (current_state & 7)) & 1 == 1
+
+    # returns the sorted list of accept states
+    def accept_state_list(self) -> list:
+        return [state_index for state_index in range(self.state_count()) if self.is_accept(state_index)]
+
+
+    """Used for representing NFA"""
+
+    # returns the same string representation as NFA.to_string
+    def to_string(self):
+        accept_states = self.accept_state_list()
+        groups = class_groups(self.classes)
+        lines = [str(self.state_count()) + " " + str(len(accept_states)) + " " + str(len(self.targets)),
+                 "".join(str(accept_state) + " " for accept_state in accept_states)]
+        if len(groups) > 0:
+            lines[0] += " " + str(len(groups))
+
+        for state_index in range(self.state_count()):
+            start = self.offsets[state_index]
+            end = self.offsets[state_index + 1]
+            line = [str(end - start) + " "]
+            for edge_index in range(start, end):
+                line.append(self.symbols[self.edge_symbols[edge_index]] + " " + str(self.targets[edge_index]) + " ")
+            lines.append("".join(line))
+
+        if len(groups) > 0:
+            lines.append(" ".join(groups))
+
+        return "\n".join(lines) + "\n"
+
+    # returns the binary representation of the NFA(see BINARY_HEADER), which can be opened without parsing
+    def to_bytes(self) -> bytes:
+        encoded_symbols = "".join(self.symbols).encode("utf-8")
+        classified = sorted(self.classes)
+        encoded_classes = ("".join(classified) + "".join(self.classes[symbol] for symbol in classified)).encode("utf-8")
+        header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, self.state_count(), len(self.symbols), len(self.targets), len(encoded_symbols),
+                                    len(classified), len(encoded_classes))
+
+        parts = [header]
+        for encoded in (encoded_symbols, encoded_classes):
+            parts.append(encoded)
+            parts.append(b"\0" * (-len(encoded) % 4))
+        for values in (self.offsets, self.edge_symbols, self.targets):
+            values = array('i', values)
+            if sys.byteorder != "little":
+                values.byteswap()
+            parts.append(values.tobytes())
+        parts.append(bytes(self.accept))
+
+        return b"".join(parts)
+
+    # returns the NFA stored in the given buffer in the binary representation.
+    # on little endian machines the arrays of the NFA are views of the buffer, nothing gets copied
+    @classmethod
+    def from_buffer(cls, buffer) -> "CompactNFA":
+        view = memoryview(buffer)
+        magic, version = struct.unpack_from("<4sI", view)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError("not a binary NFA of version " + str(BINARY_VERSION))
+        magic, version, n_states, n_symbols, n_edges, symbols_length, n_classified, classes_length = BINARY_HEADER.unpack_from(view)
+
+        position = BINARY_HEADER.size
+        symbols = list(bytes(view[position : position + symbols_length]).decode("utf-8"))
+        if len(symbols) != n_symbols:
+            raise ValueError("symbols of the binary NFA are corrupted")
+        position += symbols_length + (-symbols_length % 4)
+
+        classes = bytes(view[position : position + classes_length]).decode("utf-8")
+        if len(classes) != 2 * n_classified:
+            raise ValueError("symbol classes of the binary NFA are corrupted")
+        classes = dict(zip(classes[:n_classified], classes[n_classified:]))
+        position += classes_length + (-classes_length % 4)
+
+        arrays = []
+        for length in (n_states + 1, n_edges, n_edges):
+            values = view[position : position + 4 * length].cast('i')
+            if sys.byteorder != "little":
+                values = array('i', values)
+                values.byteswap()
+            arrays.append(values)
+            position += 4 * length
+
+        accept = view[position : position + (n_states + 7) // 8]
+
+        return cls(symbols, arrays[0], arrays[1], arrays[2], accept, classes)
+
+    # maps the binary NFA file with the given path into memory and returns it. the file stays mapped while the NFA is used
+    @classmethod
+    def open(cls, path : str) -> "CompactNFA":
+        with open(path, "rb") as binary_file:
+            mapped = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls.from_buffer(mapped)
+
+
+def main():
+    # converts the binary NFA file given as the argument to the string representation
+    print(CompactNFA.open(sys.argv[1]).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+from automata import SYMBOL_ANY
+from build import OP_CONCAT, OP_STAR, OP_UNION, symbol_classes, to_postfix
+
+# kinds of regular expression terms
+TERM_EMPTY = 0
+TERM_EPSILON = 1
+TERM_SYMBOLS = 2
+TERM_CONCAT = 3
+TERM_UNION = 4
+TERM_STAR = 5
+
+# ids of the terms that every table starts with: the one matching nothing and the one matching the empty string
+EMPTY = 0
+EPSILON = 1
+
+
+class DerivativeMatcher:
+    """Matches a regular expression with Brzozowski derivatives, without building any automaton.
+    Terms are hash-consed into int ids and kept in a canonical form(unions are flattened sets, neutral and absorbing
+    elements are dropped), so equal derivatives get the same id. Normalizing the unions is enough for an expression
+    to have finitely many derivatives, so concatenations are only kept as chains nested to the right, without
+    reassociating chains that end up as heads.
+    Every derivative is computed once and remembered, which discovers the DFA of the expression lazily,
+    only for the states that the input visits. The terms are:
+        (TERM_EMPTY, None), (TERM_EPSILON, None),
+        (TERM_SYMBOLS, frozenset of symbols) matching one of the symbols, SYMBOL_ANY matches every symbol,
+        (TERM_CONCAT, (head term id, tail term id)),
+        (TERM_UNION, frozenset of term ids), (TERM_STAR, term id)"""
+
+    """Constructor"""
+
+    # initializes the matcher for the given regular expression(same grammar as build.construct)
+    def __init__(self, regex : str) -> None:
+        postfix = to_postfix(regex)
+        self.classes = symbol_classes([postfix])
+
+        # term id -> term, term -> term id
+        self.terms = []
+        self.ids = dict()
+        # term id -> whether the term matches the empty string
+        self.nullable = []
+        # term id -> dict(symbol, term id) of the derivatives computed so far
+        self.derivatives = []
+        self.term(TERM_EMPTY, None, False)
+        self.term(TERM_EPSILON, None, True)
+
+        # symbols that appear in the expression. the rest can't be told apart, SYMBOL_ANY stands for all of them
+        self.symbols = set()
+        self.start = self.__build(postfix)
+
+    # returns the id of the term with the given kind and argument, adding it if it's new
+    def term(self, kind : int, argument, nullable : bool) -> int:
+        key = (kind, argument)
+        try:
+            return self.ids[key]
+        except KeyError:
+            pass
+
+        term_id = len(self.terms)
+        self.ids[key] = term_id
+        self.terms.append(key)
+        self.nullable.append(nullable)
+        self.derivatives.append(dict())
+        return term_id
+
+    # returns the term for the regular expression given in postfix form.
+    # runs of the same binary operator are collected first and turned into a term at once, so that
+    # long concatenations and unions don't get rebuilt for every operand
+    def __build(self, postfix : list) -> int:
+        # (operator, list of operand terms) pairs, the operator is None for a single term
+        stack = []
+        for token in postfix:
+            if token == OP_STAR:
+                stack[-1] = (None, [self.star(self.__finish(stack[-1]))])
+            elif token == OP_CONCAT or token == OP_UNION:
+                other = stack.pop()
+                operator, operands = stack[-1]
+                if operator != token:
+                    operands = [self.__finish(stack[-1])]
+                if other[0] == token:
+                    operands.extend(other[1])
+                else:
+                    operands.append(self.__finish(other))
+                stack[-1] = (token, operands)
+            else:
+                symbols = token if isinstance(token, frozenset) else (token,)
+                symbols = frozenset(self.classes.get(symbol, symbol) for symbol in symbols)
+                self.symbols.update(symbol for symbol in symbols if symbol != SYMBOL_ANY)
+                stack.append((None, [self.term(TERM_SYMBOLS, symbols, False)]))
+
+        return self.__finish(stack[0])
+
+    # returns the term for an (operator, list of operand terms) pair of __build
+    def __finish(self, entry : tuple) -> int:
+        operator, operands = entry
+        if operator == OP_CONCAT:
+            return self.concat(operands)
+        if operator == OP_UNION:
+            return self.union(operands)
+        return operands[0]
+
+
+    """Canonical constructors of terms"""
+
+    # returns the concatenation of the given terms, as a chain nested to the right. factors that are chains
+    # themselves become heads as they are instead of being copied in front, so derivatives of stars
+    # cost the same however long the chain of the derivative of their inner term is
+    def concat(self, factors : list) -> int:
+        if EMPTY in factors:
+            return EMPTY
+
+        result = EPSILON
+        for factor in reversed(factors):
+            if factor == EPSILON:
+                continue
+            if result == EPSILON:
+                result = factor
+            else:
+                result = self.term(TERM_CONCAT, (factor, result), self.nullable[factor] and self.nullable[result])
+
+        return result
+
+    # returns the union of the given terms
+    def union(self, alternatives : list) -> int:
+        flat = set()
+        for alternative in alternatives:
+            kind, argument = self.terms[alternative]
+            if kind == TERM_UNION:
+                flat.update(argument)
+            elif alternative != EMPTY:
+                flat.add(alternative)
+
+        if len(flat) == 0:
+            return EMPTY
+        if len(flat) == 1:
+            return next(iter(flat))
+
+        return self.term(TERM_UNION, frozenset(flat), any(self.nullable[alternative] for alternative in flat))
+
+    # returns the Kleene closure of the given term
+    def star(self, inner : int) -> int:
+        if inner == EMPTY or inner == EPSILON:
+            return EPSILON
+        if self.terms[inner][0] == TERM_STAR:
+            return inner
+
+        return self.term(TERM_STAR, inner, True)
+
+
+    """Derivatives"""
+
+    # returns the derivative of the term with respect to the given symbol(one of self.symbols or SYMBOL_ANY).
+    # the derivatives of the parts of the term come first, walked with an explicit stack so that deeply nested
+    # expressions don't run out of recursion depth
+    def derivative(self, term_id : int, symbol : str) -> int:
+        try:
+            return self.derivatives[term_id][symbol]
+        except KeyError:
+            pass
+
+        stack = [term_id]
+        while len(stack) > 0:
+            current_term = stack[-1]
+            if symbol in self.derivatives[current_term]:
+                stack.pop()
+                continue
+
+            missing = [part for part in self.derivative_parts(current_term) if symbol not in self.derivatives[part]]
+            if len(missing) > 0:
+                stack.extend(missing)
+                continue
+
+            stack.pop()
+            self.derivatives[current_term][symbol] = self.combine_derivatives(current_term, symbol)
+
+        return self.derivatives[term_id][symbol]
+
+    # returns the terms whose derivatives make up the derivative of the given term
+    def derivative_parts(self, term_id : int) -> list:
+        kind, argument = self.terms[term_id]
+        if kind == TERM_UNION:
+            return list(argument)
+        if kind == TERM_STAR:
+            return [argument]
+        if kind == TERM_CONCAT:
+            # d(f1 f2 ... fk) = d(f1) f2 ... fk, plus d(f2 ... fk) if f1 is nullable, and so on down the chain
+            parts = []
+            current_term = term_id
+            while self.terms[current_term][0] == TERM_CONCAT:
+                head, tail = self.terms[current_term][1]
+                parts.append(head)
+                if not self.nullable[head]:
+                    return parts
+                current_term = tail
+            parts.append(current_term)
+            return parts
+        return []
+
+    # returns the derivative of the term, the derivatives of its derivative_parts have to be known already
+    def combine_derivatives(self, term_id : int, symbol : str) -> int:
+        kind, argument = self.terms[term_id]
+        if kind == TERM_SYMBOLS:
+            return EPSILON if symbol in argument or SYMBOL_ANY in argument else EMPTY
+        if kind == TERM_UNION:
+            return self.union([self.derivatives[alternative][symbol] for alternative in argument])
+        if kind == TERM_STAR:
+            return self.concat([self.derivatives[argument][symbol], term_id])
+        if kind == TERM_CONCAT:
+            alternatives = []
+            current_term = term_id
+            while self.terms[current_term][0] == TERM_CONCAT:
+                head, tail = self.terms[current_term][1]
+                alternatives.append(self.concat([self.derivatives[head][symbol], tail]))
+                if not self.nullable[head]:
+                    break
+                current_term = tail
+            else:
+                alternatives.append(self.derivatives[current_term][symbol])
+            return self.union(alternatives)
+        return EMPTY
+
+
+    """Used for matching"""
+
+    # returns the term reached from the given one with the given symbol of the input
+    def next_state(self, term_id : int, symbol : str) -> int:
+        symbol = self.classes.get(symbol, symbol)
+        if symbol not in self.symbols:
+            symbol = SYMBOL_ANY
+
+        return self.derivative(term_id, symbol)
+
+    # returns True if the given term matches the empty string, i.e. the input read so far is accepted
+    def is_accept(self, term_id : int) -> bool:
+        return self.nullable[term_id]
+
+    # returns the Y/N answers for every prefix of the string, same as run.nfa_result for an automaton of the expression
+    def match(self, string : str) -> str:
+        current_term = self.start
+        res = []
+        for s in string:
+            current_term = self.next_state(current_term, s)
+            res.append('Y' if self.nullable[current_term] else 'N')
+
+        return "".join(res)
+
+
+# returns the Y/N answers for every prefix of the string, for the given regular expression
+def derivative_result(regex : str, string : str) -> str:
+    return DerivativeMatcher(regex).match(string)
+
+def main():
+    # reads the string, then the regular expression, and prints whether each prefix of the string matches
+    string = input()
+    regex = input()
+    print(derivative_result(regex, string))
+
+if __name__ == "__main__":
+    main()
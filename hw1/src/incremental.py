@@ -0,0 +1,230 @@
+import random
+from automata import NFA, SYMBOL_ANY
+
+
+class Node:
+    """Node of the tree of IncrementalMatcher: one symbol of the input, in order between the left and right subtrees.
+    mapping[state] is the DFA state reached from state by reading the whole span of the subtree."""
+
+    __slots__ = ("column", "priority", "left", "right", "size", "mapping")
+
+    def __init__(self, column : int, priority : float) -> None:
+        self.column = column
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.size = 1
+        self.mapping = None
+
+
+class IncrementalMatcher:
+    """Keeps the per-prefix answers of an automaton for a string that gets edited one symbol at a time.
+    The string is stored in a treap ordered by position(an implicit treap: the keys are the subtree sizes),
+    and every node keeps the transition function of the minimal DFA composed over its span. An edit only changes
+    the nodes on one path, so it costs O(|Q| log n) for a DFA with |Q| states, and the state after any prefix
+    is found in O(log n)."""
+
+    # initializes the matcher for the given NFA and the initial string. NFA MUST NOT HAVE EPSILON TRANSITIONS
+    def __init__(self, nfa : NFA, string : str = "") -> None:
+        alphabet, table, accepting = nfa.dfa_table(minimal=True)
+
+        # one extra state that every symbol leads back to and that never accepts. symbols outside the alphabet
+        # take the SYMBOL_ANY column if there is one, otherwise an extra column that leads to the extra state
+        n_states = len(table)
+        self.dead_state = n_states
+        self.other_column = alphabet.index(SYMBOL_ANY) if SYMBOL_ANY in alphabet else len(alphabet)
+        self.accepting = list(accepting) + [False]
+
+        # column_maps[column][state] is the state reached from state with a symbol of the column
+        self.column_maps = [tuple([row[column] for row in table] + [self.dead_state]) for column in range(len(alphabet))]
+        self.column_maps.append(tuple([self.dead_state] * (n_states + 1)))
+
+        # symbols of a class share the column of the symbol standing for it
+        self.columns = {symbol : column for column, symbol in enumerate(alphabet)}
+        for symbol, class_symbol in nfa.classes.items():
+            if class_symbol in self.columns:
+                self.columns[symbol] = self.columns[class_symbol]
+
+        self.root = self.__build([self.column(s) for s in string])
+
+    # returns the column of the given symbol
+    def column(self, symbol : str) -> int:
+        return self.columns.get(symbol, self.other_column)
+
+    # returns the length of the string
+    def __len__(self) -> int:
+        return 0 if self.root is None else self.root.size
+
+
+    """Tree operations"""
+
+    # recomputes the size and the mapping of the node from its children and returns the node
+    def __update(self, node : Node) -> Node:
+        mapping = self.column_maps[node.column]
+        size = 1
+        if node.left is not None:
+            left = node.left.mapping
+            mapping = [mapping[state] for state in left]
+            size += node.left.size
+        if node.right is not None:
+            right = node.right.mapping
+            mapping = [right[state] for state in mapping]
+            size += node.right.size
+
+        node.mapping = tuple(mapping)
+        node.size = size
+        return node
+
+    # returns the root of a treap holding the given columns in order
+    def __build(self, columns : list):
+        if len(columns) == 0:
+            return None
+
+        # a balanced tree, with the priorities handed out level by level so that parents always win
+        priorities = sorted((random.random() for column in columns), reverse=True)
+        nodes = [None] * len(columns)
+        # (first, last, parent, is left child) ranges of the columns still to be turned into subtrees
+        ranges = [(0, len(columns) - 1, None, False)]
+        for order, (first, last, parent, is_left) in enumerate(ranges):
+            middle = (first + last) // 2
+            node = Node(columns[middle], priorities[order])
+            nodes[middle] = node
+            if parent is not None:
+                if is_left:
+                    parent.left = node
+                else:
+                    parent.right = node
+            if first < middle:
+                ranges.append((first, middle - 1, node, True))
+            if middle < last:
+                ranges.append((middle + 1, last, node, False))
+
+        # children come after their parents in ranges, so update in reverse order
+        for first, last, parent, is_left in reversed(ranges):
+            self.__update(nodes[(first + last) // 2])
+
+        return nodes[(len(columns) - 1) // 2]
+
+    # splits the subtree into the first count symbols and the rest, returns the roots of the two parts
+    def __split(self, node : Node, count : int) -> tuple:
+        if node is None:
+            return None, None
+
+        left_size = 0 if node.left is None else node.left.size
+        if count <= left_size:
+            first, second = self.__split(node.left, count)
+            node.left = second
+            return first, self.__update(node)
+
+        first, second = self.__split(node.right, count - left_size - 1)
+        node.right = first
+        return self.__update(node), second
+
+    # joins two subtrees, all symbols of the first one coming before the ones of the second, returns the new root
+    def __merge(self, first : Node, second : Node) -> Node:
+        if first is None:
+            return second
+        if second is None:
+            return first
+
+        if first.priority > second.priority:
+            first.right = self.__merge(first.right, second)
+            return self.__update(first)
+
+        second.left = self.__merge(first, second.left)
+        return self.__update(second)
+
+
+    """Edits"""
+
+    # inserts the symbol so that it becomes the one at the given index
+    def insert(self, index : int, symbol : str):
+        if not 0 <= index <= len(self):
+            raise IndexError("insert index out of range")
+
+        node = self.__update(Node(self.column(symbol), random.random()))
+        first, second = self.__split(self.root, index)
+        self.root = self.__merge(self.__merge(first, node), second)
+
+    # deletes the symbol at the given index
+    def delete(self, index : int):
+        if not 0 <= index < len(self):
+            raise IndexError("delete index out of range")
+
+        first, rest = self.__split(self.root, index)
+        removed, second = self.__split(rest, 1)
+        self.root = self.__merge(first, second)
+
+    # replaces the symbol at the given index
+    def replace(self, index : int, symbol : str):
+        if not 0 <= index < len(self):
+            raise IndexError("replace index out of range")
+
+        # walk down to the node, then recompute the mappings on the way back up
+        column = self.column(symbol)
+        path = []
+        node = self.root
+        while True:
+            path.append(node)
+            left_size = 0 if node.left is None else node.left.size
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                break
+            else:
+                index -= left_size + 1
+                node = node.right
+
+        node.column = column
+        for node in reversed(path):
+            self.__update(node)
+
+
+    """Queries"""
+
+    # returns the DFA state after reading the first length symbols of the string
+    def state_after(self, length : int) -> int:
+        state = 0
+        node = self.root
+        while node is not None and length > 0:
+            left_size = 0 if node.left is None else node.left.size
+            if length <= left_size:
+                node = node.left
+                continue
+
+            # the whole left subtree and the node itself are read
+            if node.left is not None:
+                state = node.left.mapping[state]
+            state = self.column_maps[node.column][state]
+            length -= left_size + 1
+            node = node.right
+
+        return state
+
+    # returns True if the first length symbols of the string are accepted
+    def is_accept_prefix(self, length : int) -> bool:
+        return self.accepting[self.state_after(length)]
+
+    # returns True if the whole string is accepted
+    def is_accept(self) -> bool:
+        return self.accepting[0 if self.root is None else self.root.mapping[0]]
+
+    # returns the Y/N answers for every prefix of the string, same as run.nfa_result
+    def result(self) -> str:
+        res = []
+        state = 0
+        # in-order walk with an explicit stack
+        stack = []
+        node = self.root
+        while len(stack) > 0 or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+                continue
+
+            node = stack.pop()
+            state = self.column_maps[node.column][state]
+            res.append('Y' if self.accepting[state] else 'N')
+            node = node.right
+
+        return "".join(res)
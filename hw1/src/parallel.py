@@ -0,0 +1,186 @@
+import os
+import sys
+from multiprocessing import Pool
+from automata import NFA, SYMBOL_ANY
+
+# amount of symbols that one task of the process pool works on
+PARALLEL_CHUNK_SIZE = 1 << 22
+
+# byte written for prefixes that are(index 1) and are not(index 0) accepted
+ANSWER_BYTES = (ord('N'), ord('Y'))
+
+
+class ColumnCodes(dict):
+    """Translation table for str.translate: code point -> the character whose code is the column of the symbol.
+    Code points that aren't in it get the other column."""
+
+    def __init__(self, codes : dict, other_code : str) -> None:
+        super().__init__(codes)
+        self.other_code = other_code
+
+    def __missing__(self, code_point : int) -> str:
+        return self.other_code
+
+
+class DenseDFA:
+    """Minimal DFA of an NFA as a dense table over column codes, for running through long inputs.
+    The input is translated to one byte per symbol(the column of the symbol) with str.translate,
+    then each step is a single list lookup. Same columns as in BatchMatcher."""
+
+    # initializes the DFA for the given NFA. NFA MUST NOT HAVE EPSILON TRANSITIONS
+    def __init__(self, nfa : NFA) -> None:
+        alphabet, table, accepting = nfa.dfa_table(minimal=True)
+
+        # one extra state that every symbol leads back to and that never accepts. symbols outside the alphabet
+        # take the SYMBOL_ANY column if there is one, otherwise an extra column that leads to the extra state
+        n_states = len(table)
+        n_columns = len(alphabet) + 1
+        if n_columns > 256:
+            raise ValueError("too many symbol classes for byte sized column codes")
+        self.dead_state = n_states
+        self.table = [list(row) + [self.dead_state] for row in table] + [[self.dead_state] * n_columns]
+        self.accepting = list(accepting) + [False]
+        self.n_states = n_states + 1
+
+        # states that can't reach an accept state all behave the same, so transitions into them go to the extra state
+        predecessors = [[] for state in self.table]
+        for state, row in enumerate(self.table):
+            for next_state in row:
+                predecessors[next_state].append(state)
+        live = [False] * self.n_states
+        stack = [state for state in range(self.n_states) if self.accepting[state]]
+        for state in stack:
+            live[state] = True
+        while len(stack) > 0:
+            for other_state in predecessors[stack.pop()]:
+                if not live[other_state]:
+                    live[other_state] = True
+                    stack.append(other_state)
+        for row in self.table:
+            for column, next_state in enumerate(row):
+                if not live[next_state]:
+                    row[column] = self.dead_state
+
+        other_column = alphabet.index(SYMBOL_ANY) if SYMBOL_ANY in alphabet else len(alphabet)
+        codes = {ord(symbol) : chr(column) for column, symbol in enumerate(alphabet)}
+        for symbol, class_symbol in nfa.classes.items():
+            if class_symbol in alphabet:
+                codes[ord(symbol)] = chr(alphabet.index(class_symbol))
+        self.codes = ColumnCodes(codes, chr(other_column))
+
+    # returns the column codes of the given text(a str, or bytes read one symbol per byte)
+    def encode(self, text) -> bytes:
+        if not isinstance(text, str):
+            text = bytes(text).decode("latin-1")
+        return text.translate(self.codes).encode("latin-1")
+
+    # runs every state through the given column codes at once and returns (mapping, merge position, answers):
+    # mapping[state] is the state reached from state. the states are run in lockstep, but lanes that reach
+    # the same state are merged and only stepped once, and lanes that reach the dead state are dropped, they stay
+    # there whatever comes. merge position is the amount of codes read before at most one lane was left(None if
+    # that never happened). from there on the surviving lane is the only one that can accept, so answers are the
+    # right answers for the codes after the merge position for every start state that isn't dead by then
+    def speculate(self, codes : bytes) -> tuple:
+        table = self.table
+        dead_state = self.dead_state
+        # current state -> the states that the lanes in it started from
+        lanes = {state : [state] for state in range(self.n_states) if state != dead_state}
+        position = 0
+        while len(lanes) > 1 and position < len(codes):
+            column = codes[position]
+            merged = dict()
+            for state, starts in lanes.items():
+                next_state = table[state][column]
+                if next_state == dead_state:
+                    continue
+                if next_state in merged:
+                    merged[next_state].extend(starts)
+                else:
+                    merged[next_state] = starts
+            lanes = merged
+            position += 1
+
+        mapping = [dead_state] * self.n_states
+        if len(lanes) > 1:
+            for state, starts in lanes.items():
+                for start in starts:
+                    mapping[start] = state
+            return mapping, None, b""
+        if len(lanes) == 0:
+            return mapping, position, bytes([ANSWER_BYTES[False]]) * (len(codes) - position)
+
+        state, starts = next(iter(lanes.items()))
+        answers, state = self.run(codes[position:], state)
+        for start in starts:
+            mapping[start] = state
+        return mapping, position, answers
+
+    # returns (answers(ANSWER_BYTES) for every prefix of the given column codes, final state), starting from the given state
+    def run(self, codes : bytes, state : int) -> tuple:
+        table = self.table
+        answer = [ANSWER_BYTES[accepting] for accepting in self.accepting]
+        res = bytearray(len(codes))
+        for position, column in enumerate(codes):
+            state = table[state][column]
+            res[position] = answer[state]
+        return bytes(res), state
+
+
+# the DFA of the worker processes, given to them once when the pool starts
+worker_dfa = None
+
+def init_worker(dfa : DenseDFA):
+    global worker_dfa
+    worker_dfa = dfa
+
+# returns the text of the first length symbols of a chunk(all of them if length is None).
+# a chunk is either the text itself or a (path, offset, length) part of a file
+def read_chunk(source, length : int = None):
+    if not isinstance(source, tuple):
+        return source if length is None else source[:length]
+
+    path, offset, chunk_length = source
+    with open(path, "rb") as input_file:
+        input_file.seek(offset)
+        return input_file.read(chunk_length if length is None else min(length, chunk_length))
+
+# task of the workers: returns DenseDFA.speculate for the chunk
+def chunk_speculate(source) -> tuple:
+    return worker_dfa.speculate(worker_dfa.encode(read_chunk(source)))
+
+# yields the answers for the given chunk sources, in order, using the given amount of processes.
+# the workers run every chunk from all the states at once. composing their mappings in order gives the state
+# that every chunk really starts in, and only the symbols before the lanes merged have to be run again from it
+def parallel_answers(nfa : NFA, sources : list, processes : int = None):
+    dfa = DenseDFA(nfa)
+    with Pool(processes, initializer=init_worker, initargs=(dfa,)) as pool:
+        state = 0
+        for source, (mapping, merge_position, answers) in zip(sources, pool.imap(chunk_speculate, sources)):
+            head, head_state = dfa.run(dfa.encode(read_chunk(source, merge_position)), state)
+            # the lane of the real start state died before the others merged: nothing after that is accepted
+            if head_state == dfa.dead_state:
+                answers = bytes([ANSWER_BYTES[False]]) * len(answers)
+            yield head + answers
+            state = mapping[state]
+
+# returns the same per-prefix answers as run.nfa_result, matching the chunks of the string in parallel processes
+def parallel_result(nfa : NFA, string : str, processes : int = None, chunk_size : int = PARALLEL_CHUNK_SIZE) -> str:
+    sources = [string[start : start + chunk_size] for start in range(0, len(string), chunk_size)]
+    return b"".join(parallel_answers(nfa, sources, processes)).decode("ascii")
+
+def main():
+    # the automaton is read from the file given as the first argument, in the form given by NFA.to_string,
+    # and the input from the file given as the second one(read one symbol per byte). workers read their chunks
+    # of the input file themselves, so it's never sent between processes
+    with open(sys.argv[1]) as automaton_file:
+        nfa = NFA.from_string(automaton_file.read())
+
+    path = sys.argv[2]
+    size = os.path.getsize(path)
+    sources = [(path, offset, min(PARALLEL_CHUNK_SIZE, size - offset)) for offset in range(0, size, PARALLEL_CHUNK_SIZE)]
+    for answers in parallel_answers(nfa, sources):
+        sys.stdout.buffer.write(answers)
+    sys.stdout.buffer.write(b"\n")
+
+if __name__ == "__main__":
+    main()
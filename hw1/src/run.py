@@ -1,79 +1,74 @@
-from automata import NFA
+import argparse
+from automata import NFA, LazyDFA, BitParallelNFA, TaggedLazyDFA
+from compact import CompactNFA
 
 def nfa_result(nfa : "NFA", string : str):
-    res = ""
+    # the NFA is determinized lazily: each new set of possible states becomes a DFA state the first time we reach it,
+    # so after warming up every symbol costs a single table lookup
+    dfa = LazyDFA(nfa)
 
-    # set of all possible states at a given time
-    possible_states = set([0])
-    
-    for s in string:
-        # set of all possible states after reading the current symbol
-        new_possible_states = set()
-        # update the new possible states with moves from each currently possible state
-        for current_possible_state in possible_states:
-            new_possible_states.update(nfa.next_states(current_possible_state, s))
+    # the DFA state holding the set of all possible NFA states at a given time
+    current_state = dfa.start_state()
 
-        # update the currently possible states
-        possible_states = new_possible_states
+    # answers for each prefix of the string
+    res = []
+    for s in string:
+        current_state = dfa.next_state(current_state, s)
 
         # answer to whether one of the currently possible states is an accept state
-        curr_ans = 'N'
-        # iterate over the set of possible states
-        for possible_state in possible_states:
-            # if there's at least one accept state possible, make current answer positive and break loop
-            if possible_state in nfa.accept_states:
-                curr_ans = 'Y'
-                break
+        res.append('Y' if dfa.is_accept(current_state) else 'N')
+
+    return "".join(res)
+
+# same as nfa_result, but simulates the NFA directly, keeping the possible states as bits of an int.
+# doesn't need memory for DFA states, which can be a lot for some NFAs
+def nfa_result_bitparallel(nfa : "NFA", string : str):
+    simulator = BitParallelNFA(nfa)
+
+    # mask of all possible states at a given time
+    current_mask = simulator.start_mask
+
+    res = []
+    for s in string:
+        current_mask = simulator.next_mask(current_mask, s)
+        res.append('Y' if simulator.is_accept(current_mask) else 'N')
 
-        res += curr_ans
+    return "".join(res)
+
+# returns, for each prefix of the string, the set of tags of the accept states the NFA can be in after reading it.
+# for an NFA from build.construct_set these are the indices of the regular expressions that match the prefix
+def nfa_set_result(nfa : "NFA", string : str) -> list:
+    dfa = TaggedLazyDFA(nfa)
+    current_state = dfa.start_state()
+
+    res = []
+    for s in string:
+        current_state = dfa.next_state(current_state, s)
+        res.append(dfa.state_tags(current_state))
 
     return res
 
 def main():
+    parser = argparse.ArgumentParser(description="Reads a string and an automaton, prints whether each prefix of the string is accepted.")
+    parser.add_argument("--bitparallel", action="store_true", help="simulate the NFA with bitsets instead of a lazy DFA")
+    parser.add_argument("--binary", metavar="PATH", help="read the automaton from the given binary file instead of after the string")
+    args = parser.parse_args()
+
     string = input()
-    
-    # read and process the first line
-    desc = input().split(' ')
-    n_states = int(desc[0])
-    n_acc_states = int(desc[1])
-    n_total_transitions = int(desc[2])
-
-    # start constructing the NFA 
-    states = []
-    for i in range(n_states):
-        states.append(dict())
-    nfa = NFA(states, set())
-
-    # read the accept states
-    accept_states = input().split(' ')
-    for i in range(len(accept_states)):
-        accept_states[i] = int(accept_states[i])
-    
-    # set the accept states
-    nfa.accept_states = set(accept_states)
-
-    # take the transitions of each state
-    for i in range(n_states):
-        # info about the transitions of a single state
-        info = input().split(' ')
-        # number of transitions from the current state
-        n_transitions = int(info[0])
-        # position in the list of descriptions of transitions
-        pos = 1
-
-        for j in range(n_transitions):
-            # read the symbol and state of the transition, moving pos forward
-            symbol = info[pos]
-            pos += 1
-            state = int(info[pos])
-            pos += 1
-            # add the transition: ith state, current symbol -> current state
-            if symbol not in nfa.states[i]:
-                nfa.states[i][symbol] = set()
-            
-            nfa.states[i][symbol].add(state)
-
-    print(nfa_result(nfa, string))
+
+    if args.binary is None:
+        # the automaton comes after the string, in the form given by NFA.to_string
+        nfa = NFA.from_lines(iter(input, None))
+    else:
+        nfa = CompactNFA.open(args.binary)
+        # bit-parallel simulation works on the list of dicts form
+        if args.bitparallel:
+            nfa = nfa.to_nfa()
+
+    if args.bitparallel:
+        print(nfa_result_bitparallel(nfa, string))
+    else:
+        print(nfa_result(nfa, string))
 
 if __name__ == "__main__":
     main()
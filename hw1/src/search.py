@@ -0,0 +1,161 @@
+import sys
+from os.path import commonprefix
+from automata import LazyDFA, SYMBOL_ANY
+from build import OP_CONCAT, OP_STAR, OP_UNION, compile_regex, to_postfix
+
+# a required literal is a (literal, min offset, max offset) triple: every match of the expression contains the literal,
+# starting between min offset and max offset symbols after the start of the match. max offset is None if unbounded
+NO_LITERAL = ("", 0, 0)
+
+
+# returns the better one of two required literals for skipping text: literals with a bounded offset
+# narrow down where matches can start, then longer literals are rarer
+def better_literal(literal : tuple, other : tuple) -> tuple:
+    def key(required):
+        text, min_offset, max_offset = required
+        return len(text) > 0, max_offset is not None, len(text)
+
+    return other if key(other) > key(literal) else literal
+
+# returns the literal facts of the regular expression given in postfix form, as a
+# (exact, prefix, suffix, min length, max length, required literal) tuple: exact is the only string the expression
+# matches(None if there are more), every match starts with prefix and ends with suffix, and is between min length
+# and max length symbols long(max length is None if unbounded)
+def literal_facts(postfix : list) -> tuple:
+    stack = []
+    for token in postfix:
+        if token == OP_STAR:
+            exact, prefix, suffix, min_length, max_length, required = stack[-1]
+            stack[-1] = ("" if exact == "" else None, "", "", 0, 0 if max_length == 0 else None, NO_LITERAL)
+        elif token == OP_CONCAT:
+            other = stack.pop()
+            stack[-1] = concatenation_facts(stack[-1], other)
+        elif token == OP_UNION:
+            other = stack.pop()
+            stack[-1] = union_facts(stack[-1], other)
+        elif isinstance(token, frozenset) and len(token) == 1 or isinstance(token, str) and token != SYMBOL_ANY:
+            symbol = next(iter(token)) if isinstance(token, frozenset) else token
+            stack.append((symbol, symbol, symbol, 1, 1, (symbol, 0, 0)))
+        else:
+            # a character class or the wildcard: a single symbol, but not a known one
+            stack.append((None, "", "", 1, 1, NO_LITERAL))
+
+    return stack[0]
+
+# returns the literal facts of the concatenation of two expressions with the given facts
+def concatenation_facts(facts : tuple, other : tuple) -> tuple:
+    exact, prefix, suffix, min_length, max_length, required = facts
+    other_exact, other_prefix, other_suffix, other_min_length, other_max_length, other_required = other
+
+    new_exact = exact + other_exact if exact is not None and other_exact is not None else None
+    new_prefix = exact + other_prefix if exact is not None else prefix
+    new_suffix = suffix + other_exact if other_exact is not None else other_suffix
+    new_min_length = min_length + other_min_length
+    new_max_length = max_length + other_max_length if max_length is not None and other_max_length is not None else None
+
+    # the literals of the second expression are shifted by the length of the first one
+    text, min_offset, max_offset = other_required
+    shifted = (text, min_offset + min_length, max_offset + max_length if max_offset is not None and max_length is not None else None)
+    # the suffix of the first expression and the prefix of the second one are next to each other
+    junction = (suffix + other_prefix, min_length - len(suffix), max_length - len(suffix) if max_length is not None else None)
+
+    new_required = required
+    for candidate in (shifted, junction, (new_prefix, 0, 0), suffix_literal(new_suffix, new_min_length, new_max_length)):
+        new_required = better_literal(new_required, candidate)
+
+    return new_exact, new_prefix, new_suffix, new_min_length, new_max_length, new_required
+
+# returns the literal facts of the union of two expressions with the given facts
+def union_facts(facts : tuple, other : tuple) -> tuple:
+    exact, prefix, suffix, min_length, max_length, required = facts
+    other_exact, other_prefix, other_suffix, other_min_length, other_max_length, other_required = other
+
+    new_exact = exact if exact == other_exact else None
+    new_prefix = commonprefix([prefix, other_prefix])
+    new_suffix = commonprefix([suffix[::-1], other_suffix[::-1]])[::-1]
+    new_min_length = min(min_length, other_min_length)
+    new_max_length = max(max_length, other_max_length) if max_length is not None and other_max_length is not None else None
+
+    new_required = better_literal((new_prefix, 0, 0), suffix_literal(new_suffix, new_min_length, new_max_length))
+    return new_exact, new_prefix, new_suffix, new_min_length, new_max_length, new_required
+
+# returns the required literal for a suffix of every match of an expression with the given lengths
+def suffix_literal(suffix : str, min_length : int, max_length) -> tuple:
+    return suffix, min_length - len(suffix), max_length - len(suffix) if max_length is not None else None
+
+
+class Searcher:
+    """Finds the leftmost-longest matches of a regular expression anywhere in a text.
+    Every match has to contain the required literal of the expression(see literal_facts), so the text is searched
+    for the literal with str.find first, and the automaton only tries the starting positions that the nearest
+    occurrence of the literal allows. Starting positions are tried from the left with an anchored lazy DFA,
+    which stops as soon as no NFA state is left."""
+
+    # initializes the searcher for the given regular expression(same grammar as build.construct)
+    def __init__(self, regex : str) -> None:
+        self.literal, self.min_offset, self.max_offset = literal_facts(to_postfix(regex))[5]
+        self.dfa = LazyDFA(compile_regex(regex))
+
+    # returns the end of the longest match starting at the given position of the text, or -1 if there's none
+    def longest_match(self, text : str, start : int) -> int:
+        dfa = self.dfa
+        current_state = dfa.start_state()
+        end = start if dfa.is_accept(current_state) else -1
+        for index in range(start, len(text)):
+            current_state = dfa.next_state(current_state, text[index])
+            if dfa.is_dead(current_state):
+                break
+            if dfa.is_accept(current_state):
+                end = index + 1
+
+        return end
+
+    # returns (start, end) of the leftmost-longest match that starts at the given position or after it,
+    # or None if there's none
+    def search(self, text : str, position : int = 0):
+        while position <= len(text):
+            if len(self.literal) > 0:
+                # matches have the literal between min_offset and max_offset symbols after their start,
+                # so the first occurrence of the literal bounds where the next match can start
+                occurrence = text.find(self.literal, position + self.min_offset)
+                if occurrence == -1:
+                    return None
+                first = position if self.max_offset is None else max(position, occurrence - self.max_offset)
+                last = occurrence - self.min_offset
+            else:
+                first = position
+                last = len(text)
+
+            for start in range(first, last + 1):
+                end = self.longest_match(text, start)
+                if end != -1:
+                    return start, end
+            position = last + 1
+
+        return None
+
+    # returns the list of (start, end) spans of the non-overlapping leftmost-longest matches in the text.
+    # bytes are read one symbol per byte. after an empty match the search goes on from the next position
+    def find_all(self, text) -> list:
+        if not isinstance(text, str):
+            text = bytes(text).decode("latin-1")
+
+        spans = []
+        position = 0
+        while True:
+            span = self.search(text, position)
+            if span is None:
+                return spans
+            spans.append(span)
+            position = span[1] if span[1] > span[0] else span[0] + 1
+
+
+def main():
+    # the regular expression is given as the argument, the text is everything on the standard input.
+    # prints the start and end of every match, one match per line
+    searcher = Searcher(sys.argv[1])
+    text = sys.stdin.buffer.read()
+    sys.stdout.write("".join(str(start) + " " + str(end) + "\n" for start, end in searcher.find_all(text)))
+
+if __name__ == "__main__":
+    main()
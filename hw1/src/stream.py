@@ -0,0 +1,98 @@
+import argparse
+import io
+import sys
+from automata import NFA, LazyDFA
+
+# the answers are written to the output once this many of them are collected
+OUTPUT_BLOCK_SIZE = 1 << 16
+# amount of bytes/characters read from an input stream at once
+INPUT_CHUNK_SIZE = 1 << 16
+
+# byte written for prefixes that are(index 1) and are not(index 0) accepted
+ANSWER_BYTES = (ord('N'), ord('Y'))
+
+
+class StreamMatcher:
+    """Matches input that arrives in chunks, keeping the automaton state between them.
+    Gives the same per-prefix answers as nfa_result for the concatenation of all the chunks,
+    writing them to the output in blocks. Memory use doesn't depend on the length of the input."""
+
+    # initializes the matcher for the given NFA, writing answers to output(a text or binary file-like object)
+    def __init__(self, nfa : NFA, output, block_size : int = OUTPUT_BLOCK_SIZE) -> None:
+        self.dfa = LazyDFA(nfa)
+        self.current_state = self.dfa.start_state()
+        self.output = output
+        self.binary = not isinstance(output, io.TextIOBase)
+        self.block_size = block_size
+        self.buffer = bytearray()
+
+    # matches the next chunk of input. bytes are read one symbol per byte
+    def feed(self, chunk):
+        if not isinstance(chunk, str):
+            chunk = bytes(chunk).decode("latin-1")
+
+        dfa = self.dfa
+        buffer = self.buffer
+        current_state = self.current_state
+        for s in chunk:
+            current_state = dfa.next_state(current_state, s)
+            buffer.append(ANSWER_BYTES[dfa.is_accept(current_state)])
+
+            if len(buffer) >= self.block_size:
+                self.flush()
+        self.current_state = current_state
+
+    # writes the answers collected so far to the output
+    def flush(self):
+        if len(self.buffer) == 0:
+            return
+
+        if self.binary:
+            self.output.write(bytes(self.buffer))
+        else:
+            self.output.write(self.buffer.decode("ascii"))
+        self.buffer.clear()
+
+    # writes whatever is left in the buffer. the matcher can still be fed after this
+    def close(self):
+        self.flush()
+        self.output.flush()
+
+
+# returns the index of the first line break('\n' or '\r') in the chunk(text or bytes), or -1 if there's none
+def line_end(chunk) -> int:
+    ends = [chunk.find(line_break) for line_break in ("\n\r" if isinstance(chunk, str) else b"\n\r")]
+    ends = [end for end in ends if end != -1]
+    return min(ends) if len(ends) > 0 else -1
+
+# matches everything that can be read from the input stream(text or binary), writing the answers to output.
+# with line, only the first line is matched, without its line break, the same string run.py takes with input()
+def match_stream(nfa : NFA, input_stream, output, chunk_size : int = INPUT_CHUNK_SIZE, line : bool = False):
+    matcher = StreamMatcher(nfa, output)
+    while True:
+        chunk = input_stream.read(chunk_size)
+        if len(chunk) == 0:
+            break
+        end = line_end(chunk) if line else -1
+        if end != -1:
+            matcher.feed(chunk[:end])
+            break
+        matcher.feed(chunk)
+    matcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reads an automaton from a file and a string from the standard input, prints whether each prefix of the string is accepted.")
+    parser.add_argument("automaton", help="file with the automaton, in the form given by NFA.to_string")
+    parser.add_argument("--all-lines", action="store_true", help="match everything on the standard input, line breaks included, instead of just the first line")
+    args = parser.parse_args()
+
+    with open(args.automaton) as automaton_file:
+        nfa = NFA.from_string(automaton_file.read())
+
+    # the same answers as run.py, ending with a line break the same way
+    match_stream(nfa, sys.stdin.buffer, sys.stdout.buffer, line=not args.all_lines)
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.buffer.flush()
+
+if __name__ == "__main__":
+    main()
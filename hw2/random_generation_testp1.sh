@@ -6,8 +6,8 @@ GENERATED_MACHINES=256
 MAX_STATE_AMOUNT=16
 # all strings up to this length will be generated
 MAX_TEST_STRING_LENGTH=7
-# longest time that one test is allowed to run for(necessary for avoiding infinite cycles)
-TIMEOUT_DURATION=0.5
+# most steps that the two-tape machine may take on one string(necessary for avoiding infinite cycles)
+MAX_STEPS=1000
 
 # command for clearing old generated machines
 CLEAR_COMMAND="rm machines/*"
@@ -16,7 +16,7 @@ GENERATION_COMMAND="python3 generate_machines.py $GENERATED_MACHINES $MAX_STATE_
 # command for listing filenames of machines
 LISTING_COMMAND="ls machines/*"
 # command for running a test on a single machine
-TEST_COMMAND="python3 test.py $MAX_TEST_STRING_LENGTH"
+TEST_COMMAND="python3 test.py $MAX_TEST_STRING_LENGTH $MAX_STEPS"
 
 ################################################################
 echo "clearing old machines"
@@ -27,7 +27,7 @@ echo "starting tests"
 TEST_NUMBER=1
 for machine in $($LISTING_COMMAND)
 do
-    cat "$machine" | timeout $TIMEOUT_DURATION $TEST_COMMAND;
+    cat "$machine" | $TEST_COMMAND;
     echo -ne "test $TEST_NUMBER/$GENERATED_MACHINES"\\r
     ((TEST_NUMBER++))
 done
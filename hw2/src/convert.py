@@ -14,7 +14,7 @@ def main():
         for j in range(n_transitions):
             TTTM.add_transition(i, TwoTapeTuringMachineTransition(info[1 + j * 7], info[2 + j * 7], int(info[3 + j * 7]), info[4 + j * 7], info[5 + j * 7], info[6 + j * 7], info[7 + j * 7]))
 
-    TM = TTTM.to_single_tape()
+    TM = TTTM.to_single_tape().prune()
 
     print(TM.to_string().strip())
 
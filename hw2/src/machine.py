@@ -1,3 +1,6 @@
+import sys
+from array import array
+
 SYMBOL_EMPTY = '_'
 # to separate two tapes of the two-tape turing machine
 BABAMBABAM = 'H'
@@ -9,6 +12,149 @@ SYMBOL_EMPTY_DOT = 'E'
 NONDOT_SYMBOLS = ['0', '1', SYMBOL_EMPTY]
 DOT_SYMBOLS = [SYMBOL_ZERO_DOT, SYMBOL_ONE_DOT, SYMBOL_EMPTY_DOT]
 
+# trace modes of the run methods:
+# full _ the whole run result is returned, a line for the state after every step and the verdict at the end
+# streaming _ the same run result is written to a sink in blocks of lines, only the verdict is returned
+# summary _ a RunSummary is returned
+# none _ only the verdict is returned
+TRACE_FULL = "full"
+TRACE_STREAMING = "streaming"
+TRACE_SUMMARY = "summary"
+TRACE_NONE = "none"
+TRACE_MODES = [TRACE_FULL, TRACE_STREAMING, TRACE_SUMMARY, TRACE_NONE]
+# amount of lines that a streaming trace keeps before writing them to the sink
+TRACE_BLOCK_SIZE = 4096
+# verdicts of runs that don't accept(accepting runs end with the index of the accept state)
+VERDICT_REJECT = "-1"
+VERDICT_BUDGET_EXCEEDED = "-2"
+
+class RunSummary:
+    """Result of a run with the summary trace mode: the verdict(last line of the full run result),
+    the amount of transitions taken and the state the machine stopped in."""
+
+    def __init__(self, verdict : str, steps : int, final_state : int) -> None:
+        self.verdict = verdict
+        self.steps = steps
+        self.final_state = final_state
+
+    def accepted(self) -> bool:
+        return self.verdict != VERDICT_REJECT and self.verdict != VERDICT_BUDGET_EXCEEDED
+
+    def __repr__(self) -> str:
+        return "RunSummary(" + repr(self.verdict) + ", " + str(self.steps) + ", " + str(self.final_state) + ")"
+
+class RunTrace:
+    """Collects the lines of a run for one of the trace modes and makes the value that run returns."""
+
+    def __init__(self, mode : str, sink=None) -> None:
+        if mode not in TRACE_MODES:
+            raise ValueError("unknown trace mode " + repr(mode))
+        if mode == TRACE_STREAMING and sink is None:
+            raise ValueError("streaming trace mode needs a sink to write to")
+        self.mode = mode
+        self.sink = sink
+        # lines that aren't returned or written yet, None if the mode doesn't keep them
+        self.lines = [] if mode == TRACE_FULL or mode == TRACE_STREAMING else None
+        # amount of lines after which they are written to the sink
+        self.block_size = TRACE_BLOCK_SIZE if mode == TRACE_STREAMING else sys.maxsize
+
+    # records the line of one step
+    def add(self, line : str):
+        if self.lines is not None:
+            self.lines.append(line)
+            if len(self.lines) >= self.block_size:
+                self.flush()
+
+    # records count copies of the line, for count steps that all end in the same state
+    def add_repeated(self, line : str, count : int):
+        if self.lines is None:
+            return
+        if self.mode == TRACE_FULL:
+            self.lines.append(line * count)
+            return
+
+        # the copies go straight to the sink in blocks, so that no more than a block of lines is kept at a time
+        self.flush()
+        while count > 0:
+            block_lines = min(count, self.block_size)
+            self.sink.write(line * block_lines)
+            count -= block_lines
+
+    # writes the kept lines to the sink
+    def flush(self):
+        self.sink.write("".join(self.lines))
+        self.lines.clear()
+
+    # records the verdict and returns the result of the run
+    def finish(self, verdict : str, steps : int, final_state : int):
+        if self.mode == TRACE_FULL:
+            self.lines.append(verdict)
+            return "".join(self.lines)
+        if self.mode == TRACE_STREAMING:
+            self.lines.append(verdict)
+            self.flush()
+        elif self.mode == TRACE_SUMMARY:
+            return RunSummary(verdict, steps, final_state)
+        return verdict
+
+# amount of cells that a new tape has room for before its buffer has to grow
+TAPE_INITIAL_CAPACITY = 1024
+# amount of symbol ids that fit in a byte sized cell, tapes of machines with more symbols have int cells
+TAPE_BYTE_SYMBOLS = 256
+
+class Tape:
+    """Tape of a Turing machine with one tape symbol id per cell.
+    The cells are kept in a bytearray that is filled with blanks past the end of the tape in advance and doubles
+    in size when the head gets past it, so moving onto a new cell only moves the end of the tape.
+    Machines with more than TAPE_BYTE_SYMBOLS symbols widen the tape, the cells are an array of ints then.
+    clear keeps the buffer for the next run."""
+
+    def __init__(self, blank : int, capacity : int = TAPE_INITIAL_CAPACITY) -> None:
+        self.blank = blank
+        # a single blank cell, of the type of the buffer
+        self.filler = bytearray([blank])
+        self.cells = self.filler * capacity
+        # amount of cells on the tape, the rest of the buffer is blank
+        self.length = 0
+        self.wide = False
+
+    def __len__(self) -> int:
+        return self.length
+
+    # makes the cell at the given index part of the tape and returns the new length of the tape.
+    # the buffer is grown in place, so references to cells stay valid
+    def reach(self, index : int) -> int:
+        if index >= len(self.cells):
+            self.cells.extend(self.filler * max(len(self.cells), index + 1 - len(self.cells)))
+        if index >= self.length:
+            self.length = index + 1
+        return self.length
+
+    # appends the given symbol ids(bytes or a list of ints) to the end of the tape
+    def extend(self, data):
+        if len(data) == 0:
+            return
+        start = self.length
+        self.reach(start + len(data) - 1)
+        self.cells[start : self.length] = array('i', data) if self.wide else data
+
+    # returns the cells of the tape, as bytes(or as an array of ints if the tape is wide)
+    def contents(self):
+        return self.cells[:self.length] if self.wide else bytes(self.cells[:self.length])
+
+    # empties the tape, keeping its buffer
+    def clear(self):
+        self.cells[:self.length] = self.filler * self.length
+        self.length = 0
+
+    # switches the buffer to int cells, which can hold any symbol id. references to the old buffer become stale
+    def widen(self):
+        if self.wide:
+            return
+        self.filler = array('i', [self.blank])
+        self.cells = array('i', self.cells)
+        self.wide = True
+
 class TuringMachineTransition:
     # returns a one-element dict:
     # key: tape symbol
@@ -26,7 +172,10 @@ class TuringMachineTransition:
 class TuringMachine:
     def __init__(self) -> None:
         self.state_transitions = []
-        self.tape = []
+        # the tape keeps symbol ids: symbols[i] is the symbol with id i, SYMBOL_EMPTY has id 0
+        self.symbols = [SYMBOL_EMPTY]
+        self.symbol_ids = {SYMBOL_EMPTY : 0}
+        self.tape = Tape(0)
         self.head = 0
 
     def add_state(self):
@@ -35,35 +184,58 @@ class TuringMachine:
         self.state_transitions.append(dict())
 
     def add_transition(self, from_index : int, transition : TuringMachineTransition):
+        self.intern(transition.readSymbol)
+        self.intern(transition.writeSymbol)
         self.state_transitions[from_index].update(transition.dictized())
 
-    def run(self, input_string : str) -> str:
-        for symbol in input_string:
-            self.tape.append(symbol)
+    # returns the id of the given tape symbol, giving it the next id if it's new
+    def intern(self, symbol : str) -> int:
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if len(self.symbols) > TAPE_BYTE_SYMBOLS:
+                self.tape.widen()
+
+        return self.symbol_ids[symbol]
+
+    # runs the machine on the given input. trace is one of TRACE_MODES and decides what is returned(see there),
+    # streaming traces are written to sink. after max_steps transitions(no limit if None) the run stops
+    # with VERDICT_BUDGET_EXCEEDED
+    def run(self, input_string : str, trace : str = TRACE_FULL, max_steps : int = None, sink=None):
+        run_trace = RunTrace(trace, sink)
+        self.tape.extend([self.intern(symbol) for symbol in input_string])
+        cells = self.tape.cells
+        symbols = self.symbols
+        symbol_ids = self.symbol_ids
 
         # start at state with index 0
         curr_state_index = 0
-        run_result = ""
+        steps = 0
         while True:
             # increase length of tape if head is past it
-            while len(self.tape) <= self.head:
-                self.tape.append(SYMBOL_EMPTY)
-                # self.tape.append(SYMBOL_EMPTY)
+            if self.head >= self.tape.length:
+                self.tape.reach(self.head)
             
             # symbol read from tape
-            c_read = self.tape[self.head]
+            c_read = symbols[cells[self.head]]
 
             # reject if no transition from current state for current input
             if c_read not in self.state_transitions[curr_state_index]:
                 # reject
-                run_result += "-1"
+                verdict = VERDICT_REJECT
                 break
+
+            # stop if the step budget is used up
+            if steps == max_steps:
+                verdict = VERDICT_BUDGET_EXCEEDED
+                break
+            steps += 1
             
             # transition from the current state with the current input
             trans = self.state_transitions[curr_state_index][c_read]
             
             # write to tape
-            self.tape[self.head] = trans[1]
+            cells[self.head] = symbol_ids[trans[1]]
             
             # move head
             if trans[2].upper() == 'L':
@@ -71,24 +243,94 @@ class TuringMachine:
             elif trans[2].upper() == 'R':
                 self.head = self.head + 1
 
+            curr_state_index = trans[0]
+
             # accept the string and terminate work if we're transitioning to the last(accept) state
             if trans[0] == len(self.state_transitions) - 1:
                 # accept
-                run_result += str(len(self.state_transitions) - 1)
+                verdict = str(len(self.state_transitions) - 1)
                 break
 
-            curr_state_index = trans[0]
-
             # record index of current state
-            run_result += str(curr_state_index) + "\n"
+            run_trace.add(str(curr_state_index) + "\n")
 
-        return run_result
+        return run_trace.finish(verdict, steps, curr_state_index)
 
     # empties the tape and moves head to the beginning of the tape
     def reset(self):
-        self.tape = []
+        self.tape.clear()
         self.head = 0
 
+    # returns a compiled copy of the machine, which runs the same way but a lot faster.
+    # with run_length the tape is run-length encoded and sweeps over runs are taken at once(see RunLengthTuringMachine)
+    def compile(self, run_length : bool = False) -> "CompiledTuringMachine":
+        return RunLengthTuringMachine(self) if run_length else CompiledTuringMachine(self)
+
+    # returns an equivalent machine without the states that can't be reached from state 0, with the states that
+    # behave the same way merged into one. every run takes the same steps with the same tape and head as before,
+    # only the indices of the states in the run result change. state 0 stays the first one, the accept state the last
+    def prune(self) -> "TuringMachine":
+        accept_state = len(self.state_transitions) - 1
+
+        # states reachable from state 0, in the order they are found
+        order = [0]
+        reached = {0}
+        for state_index in order:
+            # the run stops when it gets to the accept state, unless it starts there
+            if state_index == accept_state and accept_state != 0:
+                continue
+            for trans in self.state_transitions[state_index].values():
+                if trans[0] not in reached:
+                    reached.add(trans[0])
+                    order.append(trans[0])
+        if accept_state not in reached:
+            order.append(accept_state)
+
+        # head movements that the machine treats the same way get the same key
+        def movement(direction : str) -> str:
+            return direction.upper() if direction.upper() in ('L', 'R') else ''
+
+        # split the states into blocks of equivalent states: two states stay in the same block while their transitions
+        # read the same symbols, write the same symbols, move the same way and lead to the same blocks.
+        # the accept state stops the run, so it's a block of its own
+        block = {state_index : int(state_index == accept_state) for state_index in order}
+        n_blocks = len(set(block.values()))
+        while True:
+            signatures = dict()
+            new_block = dict()
+            for state_index in order:
+                if state_index == accept_state:
+                    signature = None
+                else:
+                    signature = tuple(sorted((read_symbol, trans[1], movement(trans[2]), block[trans[0]])
+                        for read_symbol, trans in self.state_transitions[state_index].items()))
+                new_block[state_index] = signatures.setdefault((block[state_index], signature), len(signatures))
+            block = new_block
+            if len(signatures) == n_blocks:
+                break
+            n_blocks = len(signatures)
+
+        # number the blocks in the order their first states were found, with the accept state last
+        numbers = dict()
+        representatives = []
+        for state_index in order:
+            if state_index != accept_state and block[state_index] not in numbers:
+                numbers[block[state_index]] = len(representatives)
+                representatives.append(state_index)
+        numbers[block[accept_state]] = len(representatives)
+        representatives.append(accept_state)
+
+        pruned = TuringMachine()
+        for state_index in representatives:
+            pruned.add_state()
+        for number, state_index in enumerate(representatives):
+            if state_index == accept_state and accept_state != 0:
+                continue
+            for read_symbol, trans in self.state_transitions[state_index].items():
+                pruned.add_transition(number, TuringMachineTransition(read_symbol, numbers[block[trans[0]]], trans[1], trans[2]))
+
+        return pruned
+
     # returns a string representation of the machine in the form:
     # {total count of states}
     # for each state except the last one:
@@ -104,6 +346,330 @@ class TuringMachine:
 
         return res
 
+class CompiledTuringMachine:
+    """Turing machine with integer coded tape symbols and a flat transition table.
+    Symbol 0 is SYMBOL_EMPTY, so the tape is a Tape of symbol ids with blank 0. The transition for state s reading
+    symbol c is at index s * width + c of three flat tables: target state(-1 if there's no transition),
+    symbol to write and head movement(-1, 0 or 1). Symbols that no transition mentions all get the last column,
+    which has no transitions."""
+
+    def __init__(self, machine : TuringMachine) -> None:
+        # intern every symbol the machine reads or writes
+        self.symbols = [SYMBOL_EMPTY]
+        self.symbol_ids = {SYMBOL_EMPTY : 0}
+        for transitions in machine.state_transitions:
+            for read_symbol, trans in transitions.items():
+                for symbol in (read_symbol, trans[1]):
+                    if symbol not in self.symbol_ids:
+                        self.symbol_ids[symbol] = len(self.symbols)
+                        self.symbols.append(symbol)
+
+        self.n_states = len(machine.state_transitions)
+        self.width = len(self.symbols) + 1
+        # every column id has to fit in a cell, the last one too
+        self.wide = self.width > TAPE_BYTE_SYMBOLS
+        self.targets = array('i', [-1]) * (self.n_states * self.width)
+        self.writes = array('i', [0]) * (self.n_states * self.width) if self.wide else bytearray(self.n_states * self.width)
+        self.moves = array('b', [0]) * (self.n_states * self.width)
+        for state_index, transitions in enumerate(machine.state_transitions):
+            for read_symbol, trans in transitions.items():
+                cell = state_index * self.width + self.symbol_ids[read_symbol]
+                self.targets[cell] = trans[0]
+                self.writes[cell] = self.symbol_ids[trans[1]]
+                if trans[2].upper() == 'L':
+                    self.moves[cell] = -1
+                elif trans[2].upper() == 'R':
+                    self.moves[cell] = 1
+
+        # lines of the run result for every state
+        self.labels = [str(state_index) + "\n" for state_index in range(self.n_states)]
+
+        self.tape = self.new_tape()
+        self.head = 0
+
+    # returns an empty tape for the machine
+    def new_tape(self):
+        tape = Tape(0)
+        if self.wide:
+            tape.widen()
+        return tape
+
+    # appends the given string to the tape
+    def write_input(self, input_string : str):
+        unknown = len(self.symbols)
+        self.tape.extend([self.symbol_ids.get(symbol, unknown) for symbol in input_string])
+
+    # runs the machine the same way as TuringMachine.run and returns the same result, takes the same arguments
+    def run(self, input_string : str, trace : str = TRACE_FULL, max_steps : int = None, sink=None):
+        run_trace = RunTrace(trace, sink)
+        self.write_input(input_string)
+
+        targets = self.targets
+        writes = self.writes
+        moves = self.moves
+        width = self.width
+        labels = self.labels
+        accept_state = self.n_states - 1
+        tape = self.tape
+        cells = tape.cells
+        length = tape.length
+        head = self.head
+        lines = run_trace.lines
+        block_size = run_trace.block_size
+        budget = sys.maxsize if max_steps is None else max_steps
+
+        # start at state with index 0
+        curr_state_index = 0
+        steps = 0
+        while True:
+            # the head moves one cell at a time, so the tape never has to grow by more than one cell
+            if head == length:
+                length = tape.reach(head)
+
+            cell = curr_state_index * width + cells[head]
+            target = targets[cell]
+            # reject if no transition from current state for current input
+            if target < 0:
+                verdict = VERDICT_REJECT
+                break
+            # stop if the step budget is used up
+            if steps == budget:
+                verdict = VERDICT_BUDGET_EXCEEDED
+                break
+            steps += 1
+
+            cells[head] = writes[cell]
+            head += moves[cell]
+            if head < 0:
+                head = 0
+
+            curr_state_index = target
+            # accept the string and terminate work if we're transitioning to the last(accept) state
+            if target == accept_state:
+                verdict = str(accept_state)
+                break
+
+            if lines is not None:
+                lines.append(labels[target])
+                if len(lines) >= block_size:
+                    run_trace.flush()
+
+        self.head = head
+        return run_trace.finish(verdict, steps, curr_state_index)
+
+    # empties the tape and moves head to the beginning of the tape
+    def reset(self):
+        self.tape.clear()
+        self.head = 0
+
+class RunLengthTuringMachine(CompiledTuringMachine):
+    """Compiled Turing machine with a run-length encoded tape. The runs are [symbol, count] lists on two stacks,
+    one for each side of the head, with the runs nearest to the head at the ends of the stacks. A transition that
+    loops back to its state and writes the symbol it reads is a sweep: the machine keeps taking it until the run of
+    the symbol ends, so the whole run is crossed in one macro-step and the step count grows by its length.
+    Sweeps that never end(right over the blanks past the end of the tape, left into the first cell, or without
+    moving at all) are found as soon as they start."""
+
+    def __init__(self, machine : TuringMachine) -> None:
+        super().__init__(machine)
+        # sweeps[cell] is 1 if the transition at the cell of the flat tables is a sweep
+        accept_state = self.n_states - 1
+        self.sweeps = bytearray(len(self.targets))
+        for cell, target in enumerate(self.targets):
+            if target == cell // self.width and target != accept_state and self.writes[cell] == cell % self.width:
+                self.sweeps[cell] = 1
+
+        self.reset()
+
+    # the runs on the two stacks are the tape(see reset), there's no Tape
+    def new_tape(self):
+        return None
+
+    # appends the given string to the tape
+    def write_input(self, input_string : str):
+        unknown = len(self.symbols)
+        runs = []
+        for symbol in input_string:
+            symbol_id = self.symbol_ids.get(symbol, unknown)
+            if len(runs) > 0 and runs[-1][0] == symbol_id:
+                runs[-1][1] += 1
+            else:
+                runs.append([symbol_id, 1])
+
+        if len(runs) > 0 and self.current is None:
+            self.current = runs[0][0]
+            runs[0][1] -= 1
+            if runs[0][1] == 0:
+                runs.pop(0)
+
+        # the end of the tape is at the bottom of the right stack
+        runs.reverse()
+        if len(runs) > 0 and len(self.right) > 0 and runs[-1][0] == self.right[0][0]:
+            self.right[0][1] += runs.pop()[1]
+        self.right[:0] = runs
+
+    # moves the head count cells over a run of the symbol that starts under it, from the ahead stack side to the
+    # behind stack side. returns the symbol under the head after that, cells past the end of the tape are blanks
+    @staticmethod
+    def cross(ahead : list, behind : list, symbol : int, count : int) -> int:
+        if len(behind) > 0 and behind[-1][0] == symbol:
+            behind[-1][1] += count
+        else:
+            behind.append([symbol, count])
+
+        # the count - 1 other crossed cells and the new cell under the head come off the ahead stack
+        while len(ahead) > 0:
+            run = ahead[-1]
+            if run[1] > count:
+                run[1] -= count
+                return run[0]
+            count -= run[1]
+            ahead.pop()
+            if count == 0:
+                return run[0]
+        return 0
+
+    # runs the machine the same way as TuringMachine.run and returns the same result, takes the same arguments.
+    # a run that is found to never halt stops with VERDICT_BUDGET_EXCEEDED right away if there's no step budget
+    def run(self, input_string : str, trace : str = TRACE_FULL, max_steps : int = None, sink=None):
+        run_trace = RunTrace(trace, sink)
+        self.write_input(input_string)
+        if self.current is None:
+            self.current = 0
+
+        targets = self.targets
+        writes = self.writes
+        moves = self.moves
+        sweeps = self.sweeps
+        width = self.width
+        labels = self.labels
+        accept_state = self.n_states - 1
+        left = self.left
+        right = self.right
+        current = self.current
+        head = self.head
+        lines = run_trace.lines
+        block_size = run_trace.block_size
+        budget = sys.maxsize if max_steps is None else max_steps
+
+        # start at state with index 0
+        curr_state_index = 0
+        steps = 0
+        while True:
+            cell = curr_state_index * width + current
+            target = targets[cell]
+            # reject if no transition from current state for current input
+            if target < 0:
+                verdict = VERDICT_REJECT
+                break
+            # stop if the step budget is used up
+            if steps == budget:
+                verdict = VERDICT_BUDGET_EXCEEDED
+                break
+
+            move = moves[cell]
+            if sweeps[cell]:
+                # length of the run of the current symbol in the direction of the sweep, and whether the sweep never ends
+                ahead = right if move == 1 else left
+                length = 1
+                if len(ahead) > 0 and ahead[-1][0] == current:
+                    length += ahead[-1][1]
+                if move == 1:
+                    endless = current == 0 and len(ahead) == (0 if length == 1 else 1)
+                elif move == -1:
+                    endless = len(ahead) == (0 if length == 1 else 1)
+                else:
+                    endless = True
+                if endless and max_steps is None:
+                    verdict = VERDICT_BUDGET_EXCEEDED
+                    break
+
+                count = budget - steps if endless else min(length, budget - steps)
+                if move == 1:
+                    current = self.cross(right, left, current, count)
+                    head += count
+                elif move == -1:
+                    # an endless sweep to the left stays in the first cell once it gets there
+                    moved = min(count, length - 1) if endless else count
+                    if moved > 0:
+                        current = self.cross(left, right, current, moved)
+                        head -= moved
+                steps += count
+
+                if lines is not None:
+                    run_trace.add_repeated(labels[target], count)
+                continue
+            steps += 1
+
+            # write to the cell under the head and move off it
+            symbol = writes[cell]
+            if move == 1:
+                past_end = len(right) == 0
+                if len(left) > 0 and left[-1][0] == symbol:
+                    left[-1][1] += 1
+                else:
+                    left.append([symbol, 1])
+                if len(right) > 0:
+                    run = right[-1]
+                    current = run[0]
+                    run[1] -= 1
+                    if run[1] == 0:
+                        right.pop()
+                else:
+                    current = 0
+                head += 1
+            elif move == -1 and head > 0:
+                if len(right) > 0 and right[-1][0] == symbol:
+                    right[-1][1] += 1
+                else:
+                    right.append([symbol, 1])
+                run = left[-1]
+                current = run[0]
+                run[1] -= 1
+                if run[1] == 0:
+                    left.pop()
+                head -= 1
+            else:
+                current = symbol
+
+            curr_state_index = target
+            # accept the string and terminate work if we're transitioning to the last(accept) state
+            if target == accept_state:
+                verdict = str(accept_state)
+                # like in CompiledTuringMachine, a cell past the end of the tape is only added once it's read
+                if move == 1 and past_end:
+                    current = None
+                break
+
+            if lines is not None:
+                lines.append(labels[target])
+                if len(lines) >= block_size:
+                    run_trace.flush()
+
+        self.current = current
+        self.head = head
+        return run_trace.finish(verdict, steps, curr_state_index)
+
+    # returns the cells of the tape, the same as the contents of the tape of a CompiledTuringMachine after the same runs
+    def expanded_tape(self):
+        tape = CompiledTuringMachine.new_tape(self)
+        for symbol, count in self.left:
+            tape.extend([symbol] * count)
+        if self.current is not None:
+            tape.extend([self.current])
+        for symbol, count in reversed(self.right):
+            tape.extend([symbol] * count)
+        return tape.contents()
+
+    # empties the tape and moves head to the beginning of the tape
+    def reset(self):
+        # runs on the left and on the right of the head
+        self.left = []
+        self.right = []
+        # symbol under the head, None while the head is past the end of the tape
+        self.current = None
+        self.head = 0
+
 class TwoTapeTuringMachineTransition:
     # returns a one-element dict:
     # key: two-element string _ symbols to read from the two tapes
@@ -123,8 +689,11 @@ class TwoTapeTuringMachineTransition:
 class TwoTapeTuringMachine:
     def __init__(self):
         self.state_transitions = []
-        self.tape1 = []
-        self.tape2 = []
+        # both tapes keep symbol ids: symbols[i] is the symbol with id i, SYMBOL_EMPTY has id 0
+        self.symbols = [SYMBOL_EMPTY]
+        self.symbol_ids = {SYMBOL_EMPTY : 0}
+        self.tape1 = Tape(0)
+        self.tape2 = Tape(0)
         self.head1 = 0
         self.head2 = 0
 
@@ -134,8 +703,21 @@ class TwoTapeTuringMachine:
         self.state_transitions.append(dict())
 
     def add_transition(self, from_index : int, transition : TwoTapeTuringMachineTransition):
+        for symbol in (transition.readSymbol1, transition.readSymbol2, transition.writeSymbol1, transition.writeSymbol2):
+            self.intern(symbol)
         self.state_transitions[from_index].update(transition.dictized())
 
+    # same as TuringMachine.intern, the ids are shared by both tapes
+    def intern(self, symbol : str) -> int:
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if len(self.symbols) > TAPE_BYTE_SYMBOLS:
+                self.tape1.widen()
+                self.tape2.widen()
+
+        return self.symbol_ids[symbol]
+
     def to_single_tape(self) -> TuringMachine:
         ################################################################################
         TM = TuringMachine()
@@ -447,32 +1029,42 @@ class TwoTapeTuringMachine:
         """Return the constructed single-tape turing machine at the end"""
         return TM
     
-    def run(self, input_string : str) -> str:
-        for symbol in input_string:
-            self.tape1.append(symbol)
+    # same as TuringMachine.run, with a step for every transition of the two-tape machine
+    def run(self, input_string : str, trace : str = TRACE_FULL, max_steps : int = None, sink=None):
+        run_trace = RunTrace(trace, sink)
+        self.tape1.extend([self.intern(symbol) for symbol in input_string])
+        cells1 = self.tape1.cells
+        cells2 = self.tape2.cells
+        symbols = self.symbols
+        symbol_ids = self.symbol_ids
 
         curr_state_index = 0
-        run_result = ""
+        steps = 0
         while True:
             if curr_state_index == len(self.state_transitions) - 1:
-                run_result += str(len(self.state_transitions) - 1)
+                verdict = str(len(self.state_transitions) - 1)
                 break
 
-            while len(self.tape1) <= self.head1:
-                self.tape1.append(SYMBOL_EMPTY)
-            while len(self.tape2) <= self.head2:
-                self.tape2.append(SYMBOL_EMPTY)
+            if self.head1 >= self.tape1.length:
+                self.tape1.reach(self.head1)
+            if self.head2 >= self.tape2.length:
+                self.tape2.reach(self.head2)
             
-            ss_read = self.tape1[self.head1] + self.tape2[self.head2]
+            ss_read = symbols[cells1[self.head1]] + symbols[cells2[self.head2]]
 
             if ss_read not in self.state_transitions[curr_state_index]:
-                run_result += "-1"
+                verdict = VERDICT_REJECT
+                break
+
+            if steps == max_steps:
+                verdict = VERDICT_BUDGET_EXCEEDED
                 break
+            steps += 1
 
             trans = self.state_transitions[curr_state_index][ss_read]
 
-            self.tape1[self.head1] = trans[1][0]
-            self.tape2[self.head2] = trans[1][1]
+            cells1[self.head1] = symbol_ids[trans[1][0]]
+            cells2[self.head2] = symbol_ids[trans[1][1]]
 
             if trans[2][0].upper() == 'L':
                 self.head1 = 0 if self.head1 == 0 else self.head1 - 1
@@ -484,19 +1076,19 @@ class TwoTapeTuringMachine:
             elif trans[2][1].upper() == 'R':
                 self.head2 = self.head2 + 1
 
+            curr_state_index = trans[0]
+
             if trans[0] == len(self.state_transitions) - 1:
-                run_result += str(len(self.state_transitions) - 1)
+                verdict = str(len(self.state_transitions) - 1)
                 break
 
-            curr_state_index = trans[0]
-
-            run_result += str(curr_state_index) + "\n"
+            run_trace.add(str(curr_state_index) + "\n")
         
-        return run_result
+        return run_trace.finish(verdict, steps, curr_state_index)
 
     def reset(self):
-        self.tape1 = []
-        self.tape2 = []
+        self.tape1.clear()
+        self.tape2.clear()
         self.head1 = 0
         self.head2 = 0
 
@@ -1,5 +1,16 @@
 import sys
-from src.machine import TuringMachine, TuringMachineTransition, TwoTapeTuringMachine, TwoTapeTuringMachineTransition
+from src.machine import TuringMachine, TuringMachineTransition, TwoTapeTuringMachine, TwoTapeTuringMachineTransition, TRACE_SUMMARY, VERDICT_BUDGET_EXCEEDED, VERDICT_REJECT
+
+# step budget of the two-tape machine, unless given as the second command-line argument
+DEFAULT_MAX_STEPS = 1000
+# the single-tape machine keeps both tapes and three separators on its tape. the first tape starts with the input
+# (or one empty cell) and the second one with one empty cell, and every step of the two-tape machine adds at most
+# one cell to each of them, so after k steps on an input of length n the tape has at most n + 2k + 5 cells.
+# setup passes over the input a few times, and simulating one step walks right over the tape to find and update
+# the dotted heads, walks back, and shifts the cells to the right of a head that runs off the end of its tape:
+# a handful of passes over the tape. random machines never needed more than 4 single-tape steps per cell for a
+# step (or for setup), so SINGLE_TAPE_PASSES * (k + 1) * (n + 2k + 5) steps are plenty for a correct conversion
+SINGLE_TAPE_PASSES = 16
 
 def main():
     # take two-tape machine as input
@@ -16,7 +27,9 @@ def main():
             TTTM.add_transition(i, TwoTapeTuringMachineTransition(info[1 + j * 7], info[2 + j * 7], int(info[3 + j * 7]), info[4 + j * 7], info[5 + j * 7], info[6 + j * 7], info[7 + j * 7]))
     #
     # convert the machine to single tape
-    TM = TTTM.to_single_tape()
+    TM = TTTM.to_single_tape().prune()
+    compiled_TM = TM.compile()
+    max_steps = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_STEPS
     #
     # generate all strings of length at most first command-line argument
     strings = ['']
@@ -37,18 +50,30 @@ def main():
     for s in strings:
         # if len(TTTM.state_transitions) > 2 or len(TTTM.state_transitions[0]) > 6:
         #     continue
-        tm_run = TM.run(s)
-        tttm_run = TTTM.run(s)
-        TM.reset()
+        tttm_run = TTTM.run(s, TRACE_SUMMARY, max_steps)
         TTTM.reset()
-        if tm_run[-2:] == '-1' and tttm_run[-2:] == '-1':
+        # the two-tape machine doesn't halt in time, nothing to compare
+        if tttm_run.verdict == VERDICT_BUDGET_EXCEEDED:
+            continue
+        tm_max_steps = SINGLE_TAPE_PASSES * (tttm_run.steps + 1) * (len(s) + 2 * tttm_run.steps + 5)
+        tm_run = compiled_TM.run(s, TRACE_SUMMARY, tm_max_steps)
+        compiled_TM.reset()
+        # the two-tape machine halted, but the single-tape one takes far longer than its simulation should
+        if tm_run.verdict == VERDICT_BUDGET_EXCEEDED:
+            print(TTTM.to_string() + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n" + tttm_run.verdict + " after " + str(tttm_run.steps) + " steps")
+            print(TM.to_string() + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n" + "no verdict after " + str(tm_max_steps) + " steps")
+            print("SINGLE-TAPE MACHINE RAN OUT OF STEPS ON STRING \"" + s + "\"")
+            print("||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||")
+            break
+        if tm_run.verdict == VERDICT_REJECT and tttm_run.verdict == VERDICT_REJECT:
             # print("\""  + s + "\" REJECTED BY BOTH")
             continue
-        if tm_run[-2:] != '-1' and tttm_run[-2:] != '-1':
+        if tm_run.accepted() and tttm_run.accepted():
             # print("\"" + s + "\" ACCEPTED BY BOTH")
             continue
-        print(TTTM.to_string() + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n" + tttm_run)
-        print(TM.to_string() + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n" + tm_run)
+        # run again for the full traces
+        print(TTTM.to_string() + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n" + TTTM.run(s, max_steps=max_steps))
+        print(TM.to_string() + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n" + TM.run(s, max_steps=tm_run.steps))
         print("COMPARISON FAILED ON STRING \"" + s + "\"")
         print("||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||||")
         break